@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import create_access_token
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.schemas.auth import LoginRequest, RegisterRequest, TokenResponse
 from app.services.users import authenticate_user, create_user, get_user_by_email
 
@@ -11,18 +11,18 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
-    existing = get_user_by_email(db, request.email)
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    existing = await get_user_by_email(db, request.email)
     if existing:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
-    user = create_user(db, request.email, request.password)
+    user = await create_user(db, request.email, request.password)
     token = create_access_token(str(user.id))
     return TokenResponse(access_token=token)
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = authenticate_user(db, request.email, request.password)
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, request.email, request.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     token = create_access_token(str(user.id))
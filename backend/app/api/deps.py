@@ -1,12 +1,13 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.models.user import UserORM
+from app.services.principals import Principal, principal_cache
 from app.services.stores import get_store_by_id, get_store_owned
 from app.services.rate_limit import check_rate_limit
 
@@ -14,10 +15,12 @@ from app.services.rate_limit import check_rate_limit
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(
+# FastAPI caches dependency results per request, so the route, the rate limiter
+# and get_store_for_user share a single resolution.
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> UserORM:
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
         subject = payload.get("sub")
@@ -30,32 +33,37 @@ def get_current_user(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = db.query(UserORM).filter(UserORM.id == user_id).first()
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    user = await db.get(UserORM, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(principal)
+    return principal
 
 
-def get_store_for_user(
+async def get_store_for_user(
     store_id: uuid.UUID,
-    current_user: UserORM = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    store = get_store_owned(db, store_id, current_user.id)
+    store = await get_store_owned(db, store_id, current_user.id)
     if store:
         return store
-    existing = get_store_by_id(db, store_id)
+    existing = await get_store_by_id(db, store_id)
     if not existing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Store not found")
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
 
 def rate_limit_dependency(endpoint: str, limit: int, window_seconds: int):
-    def _dependency(
-        current_user: UserORM = Depends(get_current_user),
-        db: Session = Depends(get_db),
+    async def _dependency(
+        current_user: Principal = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db),
     ):
-        allowed, retry_after = check_rate_limit(db, current_user.id, endpoint, limit, window_seconds)
+        allowed, retry_after = await check_rate_limit(db, current_user.id, endpoint, limit, window_seconds)
         if not allowed:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.db.session import get_db
+from app.schemas.pool import WarmPoolStats
+from app.services.principals import Principal
+from app.services.pool import get_pool_stats
+
+
+router = APIRouter(prefix="/pool", tags=["pool"])
+
+
+@router.get("/stats", response_model=WarmPoolStats)
+def pool_stats(
+    _: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return get_pool_stats(db)
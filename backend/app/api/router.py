@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
 from app.api.auth import router as auth_router
+from app.api.pool import router as pool_router
 from app.api.stores import router as stores_router
 
 
 api_router = APIRouter()
 api_router.include_router(auth_router)
 api_router.include_router(stores_router)
+api_router.include_router(pool_router)
@@ -1,21 +1,53 @@
+import asyncio
 import uuid
+from datetime import timezone
+from email.utils import format_datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_store_for_user, rate_limit_dependency
-from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.models.store import StoreORM
-from app.models.user import UserORM
-from app.schemas.store import CreateStoreRequest, HealthStatus, StoreDetailsResponse, StoreResponse, StoreStatus
+from app.schemas.store import (
+    BatchCreateStoresRequest,
+    BatchDeleteStoresRequest,
+    BatchItemStatus,
+    BatchResponse,
+    CreateStoreRequest,
+    HealthStatus,
+    StoreDetailsResponse,
+    StoreHealthStatus,
+    StoreResponse,
+    StoreStatus,
+)
+from app.schemas.timing import PhaseTimingsResponse, TimedOperation
 from app.services.audit import log_audit
-from app.services.k8s_client import K8sClient
+from app.services.k8s_client import get_k8s_client
+from app.services.pool import claim_pooled_store
+from app.services.principals import Principal
 from app.services.quotas import check_quota
-from app.tasks.store_tasks import delete_store_task, provision_store_task
+from app.services.stores import (
+    create_stores_batch,
+    list_stores_page,
+    mark_stores_deleting,
+    store_domain,
+    store_list_etag,
+    store_list_item,
+    store_list_version,
+)
+from app.services.timings import get_phase_timings
+from app.tasks.store_tasks import (
+    delete_store_task,
+    delete_stores_batch,
+    provision_store_task,
+    provision_stores_batch,
+)
 
 
-router = APIRouter(prefix="/stores", tags=["stores"])
+router = APIRouter(prefix="/stores", tags=["stores"], default_response_class=ORJSONResponse)
 
 
 @router.post(
@@ -24,44 +56,47 @@ router = APIRouter(prefix="/stores", tags=["stores"])
     response_model=StoreResponse,
     dependencies=[Depends(rate_limit_dependency("POST /stores", 1, 60))],
 )
-def create_store(
+async def create_store(
     request: CreateStoreRequest,
     req: Request,
-    current_user: UserORM = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     slug = request.name
-    domain = f"{slug}.{settings.public_ip}.{settings.base_domain}"
+    domain = store_domain(slug)
     if request.domain and request.domain != domain:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Domain must be {domain} for nip.io routing",
         )
 
-    if not check_quota(db, current_user.id, current_user.store_quota):
+    if not await check_quota(db, current_user.id, current_user.store_quota):
         raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Quota exceeded")
 
-    existing = db.query(StoreORM).filter(StoreORM.domain == domain).first()
+    existing = await db.scalar(select(StoreORM.id).where(StoreORM.domain == domain))
     if existing:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Domain already in use")
 
-    store_id = uuid.uuid4()
-    store = StoreORM(
-        id=store_id,
-        user_id=current_user.id,
-        name=slug,
-        domain=domain,
-        namespace=f"store-{store_id}",
-        status=StoreStatus.PENDING.value,
-        helm_release_name=f"store-{store_id}",
-    )
-    db.add(store)
-    db.commit()
-    db.refresh(store)
+    store = await claim_pooled_store(db, current_user.id, slug, domain)
+    if store is None:
+        store_id = uuid.uuid4()
+        store = StoreORM(
+            id=store_id,
+            user_id=current_user.id,
+            name=slug,
+            domain=domain,
+            namespace=f"store-{store_id}",
+            status=StoreStatus.PENDING.value,
+            helm_release_name=f"store-{store_id}",
+        )
+        db.add(store)
+        await db.commit()
+        await db.refresh(store)
 
-    provision_store_task.delay(str(store.id))
+    # Publishing to the broker is blocking I/O.
+    await asyncio.to_thread(provision_store_task.delay, str(store.id))
 
-    log_audit(
+    await log_audit(
         db,
         user_id=current_user.id,
         action="create_store",
@@ -73,35 +108,164 @@ def create_store(
     return store
 
 
+@router.post(
+    "/batch",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BatchResponse,
+    dependencies=[Depends(rate_limit_dependency("POST /stores/batch", 1, 60))],
+)
+async def create_stores(
+    request: BatchCreateStoresRequest,
+    req: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    results = await create_stores_batch(db, current_user.id, current_user.store_quota, request.stores)
+    store_ids = [str(item.store_id) for item in results if item.status == BatchItemStatus.ACCEPTED]
+    if store_ids:
+        await asyncio.to_thread(provision_stores_batch, store_ids)
+        await log_audit(
+            db,
+            user_id=current_user.id,
+            action="create_store_batch",
+            resource_type="store",
+            details={"store_ids": store_ids},
+            ip_address=req.client.host if req and req.client else None,
+        )
+    return BatchResponse(accepted=len(store_ids), rejected=len(results) - len(store_ids), results=results)
+
+
+# Declared before DELETE /{store_id} so "batch" is not parsed as a store id.
+@router.delete("/batch", status_code=status.HTTP_202_ACCEPTED, response_model=BatchResponse)
+async def delete_stores(
+    request: BatchDeleteStoresRequest,
+    req: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    results = await mark_stores_deleting(db, current_user.id, request.store_ids)
+    store_ids = [str(item.store_id) for item in results if item.status == BatchItemStatus.ACCEPTED]
+    if store_ids:
+        await asyncio.to_thread(delete_stores_batch, store_ids)
+        await log_audit(
+            db,
+            user_id=current_user.id,
+            action="delete_store_batch",
+            resource_type="store",
+            details={"store_ids": store_ids},
+            ip_address=req.client.host if req and req.client else None,
+        )
+    return BatchResponse(accepted=len(store_ids), rejected=len(results) - len(store_ids), results=results)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @router.get("", response_model=list[StoreResponse])
-def list_stores(
-    current_user: UserORM = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def list_stores(
+    status_filter: list[StoreStatus] | None = Query(None, alias="status"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(None),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Newest stores first. X-Next-Cursor carries the cursor of the next page.
+
+    Polls that send the previous ETag in If-None-Match get a 304 without any
+    store rows being loaded.
+    """
+    statuses = sorted(set(status_filter), key=list(StoreStatus).index) if status_filter else None
+    last_modified, count = await store_list_version(db, current_user.id, statuses)
+    etag = store_list_etag(current_user.id, last_modified, count, statuses, limit, cursor)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        stores, next_cursor = await list_stores_page(db, current_user.id, limit, cursor, statuses)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    # Rows are already in StoreResponse shape; skip per-row model validation.
+    return ORJSONResponse([store_list_item(row) for row in stores], headers=headers)
+
+
+# Declared before GET /{store_id} so "phase-timings" is not parsed as a store id.
+@router.get("/phase-timings", response_model=PhaseTimingsResponse)
+async def phase_timings(
+    window_minutes: int = Query(60, ge=1, le=43200),
+    operation: TimedOperation | None = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    stores = db.query(StoreORM).filter(StoreORM.user_id == current_user.id).all()
-    return stores
+    return await get_phase_timings(db, window_minutes, operation, user_id=current_user.id)
+
+
+def _health(wordpress: list[bool], mysql: list[bool]) -> dict:
+    wordpress_ready = bool(wordpress) and all(wordpress)
+    mysql_ready = bool(mysql) and all(mysql)
+    healthy = wordpress_ready and mysql_ready
+    return {
+        "healthy": healthy,
+        "wordpress_ready": wordpress_ready,
+        "mysql_ready": mysql_ready,
+        "details": None if healthy else "One or more pods not ready",
+    }
+
+
+# Declared before GET /{store_id} so "health" is not parsed as a store id.
+@router.get("/health", response_model=list[StoreHealthStatus])
+async def fleet_health(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Health of every store the user owns, from a single pod listing."""
+    rows = (
+        await db.execute(
+            select(StoreORM.id, StoreORM.namespace)
+            .where(StoreORM.user_id == current_user.id)
+            .order_by(StoreORM.created_at.desc(), StoreORM.id.desc())
+        )
+    ).all()
+    if not rows:
+        return []
+    k8s = await asyncio.to_thread(get_k8s_client)
+    pods = await asyncio.to_thread(k8s.get_pod_statuses, {row.namespace for row in rows}, ["wordpress", "mysql"])
+    return [
+        StoreHealthStatus(
+            store_id=row.id,
+            **_health(pods[row.namespace].get("wordpress", []), pods[row.namespace].get("mysql", [])),
+        )
+        for row in rows
+    ]
 
 
 @router.get("/{store_id}", response_model=StoreDetailsResponse)
-def get_store(
+async def get_store(
     store: StoreORM = Depends(get_store_for_user),
 ):
     return store
 
 
 @router.delete("/{store_id}", status_code=status.HTTP_202_ACCEPTED)
-def delete_store(
+async def delete_store(
     req: Request,
     store: StoreORM = Depends(get_store_for_user),
-    current_user: UserORM = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     store.status = StoreStatus.DELETING.value
-    db.commit()
+    await db.commit()
 
-    delete_store_task.delay(str(store.id))
+    await asyncio.to_thread(delete_store_task.delay, str(store.id))
 
-    log_audit(
+    await log_audit(
         db,
         user_id=current_user.id,
         action="delete_store",
@@ -114,20 +278,13 @@ def delete_store(
 
 
 @router.get("/{store_id}/health", response_model=HealthStatus)
-def store_health(
+async def store_health(
     store: StoreORM = Depends(get_store_for_user),
 ):
-    k8s = K8sClient()
-    wordpress = k8s.get_pod_status(store.namespace, "app=wordpress")
-    mysql = k8s.get_pod_status(store.namespace, "app=mysql")
-
-    wordpress_ready = all(p["ready"] for p in wordpress) if wordpress else False
-    mysql_ready = all(p["ready"] for p in mysql) if mysql else False
-    healthy = wordpress_ready and mysql_ready
-
-    return HealthStatus(
-        healthy=healthy,
-        wordpress_ready=wordpress_ready,
-        mysql_ready=mysql_ready,
-        details=None if healthy else "One or more pods not ready",
+    k8s = await asyncio.to_thread(get_k8s_client)
+    wordpress, mysql = await asyncio.gather(
+        asyncio.to_thread(k8s.get_pod_status, store.namespace, "app=wordpress"),
+        asyncio.to_thread(k8s.get_pod_status, store.namespace, "app=mysql"),
     )
+
+    return HealthStatus(**_health([p["ready"] for p in wordpress], [p["ready"] for p in mysql]))
@@ -0,0 +1,283 @@
+"""Prometheus metrics for the API and the Celery workers.
+
+The API serves its registry at /metrics. Workers serve theirs on
+worker_metrics_port; with prefork pools set PROMETHEUS_MULTIPROC_DIR so the
+child processes' samples are aggregated.
+"""
+import logging
+import os
+import re
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import REGISTRY
+from redis.exceptions import RedisError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger("metrics")
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template, method and status.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and method.",
+    ["method", "route"],
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool.",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+PRINCIPAL_CACHE_LOOKUPS = Counter(
+    "principal_cache_lookups_total",
+    "Authenticated-user cache lookups by result (hit or miss).",
+    ["result"],
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task runtime by task name and final state.",
+    ["task", "state"],
+    buckets=(0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+K8S_API_DURATION = Histogram(
+    "k8s_api_request_duration_seconds",
+    "Kubernetes API call latency by verb, path template and outcome.",
+    ["method", "path", "outcome"],
+)
+K8S_CLIENT_THROTTLE = Histogram(
+    "k8s_client_throttle_seconds",
+    "Time Kubernetes API calls waited for the client-side rate limiter.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+K8S_API_RETRIES = Counter(
+    "k8s_api_retries_total",
+    "Kubernetes API calls retried after a 429 or 5xx, by status.",
+    ["status"],
+)
+HELM_COMMAND_DURATION = Histogram(
+    "helm_command_duration_seconds",
+    "helm subprocess duration by subcommand and outcome.",
+    ["command", "outcome"],
+    buckets=(0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1200),
+)
+
+# Routes that are not worth timing.
+_UNTIMED_ROUTES = {"/metrics", "/health"}
+_NAMESPACE_RE = re.compile(r"/namespaces/[^/]+")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: dict[Any, str] | None = None
+
+    def _route_template(self, scope) -> str | None:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return None
+        if self._routes is None:
+            self._routes = {
+                getattr(route, "endpoint", None): getattr(route, "path", "") for route in scope["app"].routes
+            }
+        return self._routes.get(endpoint)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route_template(scope)
+            if route and route not in _UNTIMED_ROUTES:
+                method = scope["method"]
+                HTTP_REQUEST_DURATION.labels(method, route).observe(perf_counter() - started)
+                HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+
+
+class _TimedCheckout:
+    """Pool mixin recording how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self._engine_label).observe(perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    _engine_label = "sync"
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    _engine_label = "async"
+
+
+class DBPoolCollector:
+    def _families(self):
+        return (
+            GaugeMetricFamily("db_pool_size", "Configured SQLAlchemy pool size.", labels=["engine"]),
+            GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out.", labels=["engine"]),
+            GaugeMetricFamily("db_pool_overflow", "Connections open beyond pool_size.", labels=["engine"]),
+        )
+
+    def describe(self):
+        # Declared up front so registering does not open the engines.
+        return self._families()
+
+    def collect(self):
+        from app.db.session import async_engine, engine
+
+        size, checked_out, overflow = self._families()
+        for label, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+            if isinstance(pool, QueuePool):
+                size.add_metric([label], pool.size())
+                checked_out.add_metric([label], pool.checkedout())
+                overflow.add_metric([label], max(pool.overflow(), 0))
+        return [size, checked_out, overflow]
+
+
+class CeleryQueueCollector:
+    # kombu's Redis transport keeps one list per priority step.
+    PRIORITY_STEPS = (0, 3, 6, 9)
+    SEPARATOR = "\x06\x16"
+
+    def describe(self):
+        yield GaugeMetricFamily("celery_queue_length", "Messages waiting in each Celery queue.", labels=["queue"])
+
+    def collect(self):
+        from app.services.redis_client import get_redis
+        from app.tasks.celery_app import QUEUES
+
+        gauge = GaugeMetricFamily("celery_queue_length", "Messages waiting in each Celery queue.", labels=["queue"])
+        try:
+            pipe = get_redis().pipeline()
+            for queue in QUEUES:
+                for step in self.PRIORITY_STEPS:
+                    pipe.llen(queue if step == 0 else f"{queue}{self.SEPARATOR}{step}")
+            lengths = pipe.execute()
+        except RedisError as exc:
+            logger.warning(f"metrics.queue_length_failed: {exc}")
+            return
+        steps = len(self.PRIORITY_STEPS)
+        for index, queue in enumerate(QUEUES):
+            gauge.add_metric([queue], sum(lengths[index * steps:(index + 1) * steps]))
+        yield gauge
+
+
+REGISTRY.register(DBPoolCollector())
+REGISTRY.register(CeleryQueueCollector())
+
+
+def k8s_path_template(resource_path: str) -> str:
+    # Typed clients pass templates; the dynamic client passes concrete paths.
+    return _NAMESPACE_RE.sub("/namespaces/{namespace}", resource_path)
+
+
+def _k8s_outcome(exc: Exception) -> str:
+    return str(getattr(exc, "status", None) or "error")
+
+
+def instrument_api_client(api_client):
+    """Time every request made through a kubernetes ApiClient."""
+    call_api = api_client.call_api
+
+    def timed_call_api(resource_path, method, *args, **kwargs):
+        started = perf_counter()
+        outcome = "success"
+        try:
+            return call_api(resource_path, method, *args, **kwargs)
+        except Exception as exc:
+            outcome = _k8s_outcome(exc)
+            raise
+        finally:
+            K8S_API_DURATION.labels(method, k8s_path_template(resource_path), outcome).observe(perf_counter() - started)
+
+    api_client.call_api = timed_call_api
+    return api_client
+
+
+def instrument_async_api_client(api_client):
+    """instrument_api_client for kubernetes_asyncio clients."""
+    call_api = api_client.call_api
+
+    async def timed_call_api(resource_path, method, *args, **kwargs):
+        started = perf_counter()
+        outcome = "success"
+        try:
+            return await call_api(resource_path, method, *args, **kwargs)
+        except Exception as exc:
+            outcome = _k8s_outcome(exc)
+            raise
+        finally:
+            K8S_API_DURATION.labels(method, k8s_path_template(resource_path), outcome).observe(perf_counter() - started)
+
+    api_client.call_api = timed_call_api
+    return api_client
+
+
+@contextmanager
+def time_helm(command: list[str]):
+    started = perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        HELM_COMMAND_DURATION.labels(command[1], outcome).observe(perf_counter() - started)
+
+
+def instrument_celery(celery_app):
+    """Record task runtimes and serve worker metrics on worker_metrics_port."""
+    from celery.signals import task_postrun, task_prerun, worker_init
+
+    started: dict[str, float] = {}
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task_id=None, **_):
+        started[task_id] = perf_counter()
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task_id=None, task=None, state=None, **_):
+        start = started.pop(task_id, None)
+        if start is not None and task is not None:
+            CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(perf_counter() - start)
+
+    @worker_init.connect(weak=False)
+    def _serve_metrics(**_):
+        if settings.worker_metrics_port <= 0:
+            return
+        registry = REGISTRY
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            registry.register(CeleryQueueCollector())
+        start_http_server(settings.worker_metrics_port, registry=registry)
+        logger.info(f"metrics.worker_server_started: port={settings.worker_metrics_port}")
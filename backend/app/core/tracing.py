@@ -0,0 +1,296 @@
+"""OpenTelemetry tracing for the store lifecycle.
+
+A store's trace starts at the request that created it and follows the Celery
+messages (including countdown reschedules and retries) to every helm command,
+Kubernetes call and SQL statement made for it. APP_TRACING_EXPORTER picks
+where finished spans go: "none", "console", "file" (JSON lines appended to
+APP_TRACING_FILE_PATH), "memory" (kept in-process on memory_exporter) or a
+"package.module:ExporterClass" import path for any other SpanExporter.
+
+scripts/trace_report.py rebuilds one store's critical path from a "file" export.
+"""
+import importlib
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Sequence
+
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+from opentelemetry.propagators.textmap import Getter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind
+
+from app.core.config import settings
+from app.core.metrics import k8s_path_template
+
+logger = logging.getLogger("tracing")
+
+tracer = trace.get_tracer("urumi")
+
+# Set when APP_TRACING_EXPORTER=memory.
+memory_exporter: InMemorySpanExporter | None = None
+
+_configured = False
+_UNTRACED_PATHS = {"/metrics", "/health"}
+# Longest SQL statement stored on a span.
+_MAX_STATEMENT_LENGTH = 1000
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Append finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            # Opened per batch so forked worker processes never share a handle.
+            with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(lines)
+        except OSError as exc:
+            logger.warning(f"tracing.export_failed: {exc}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _exporter_from_path(path: str) -> SpanExporter:
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def setup_tracing(service_name: str):
+    """Install the tracer provider for this process; no-op when tracing is off."""
+    global _configured, memory_exporter
+    exporter = settings.tracing_exporter
+    if _configured or exporter == "none":
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    if exporter == "memory":
+        memory_exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+    elif exporter == "console":
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    elif exporter == "file":
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(settings.tracing_file_path)))
+    elif ":" in exporter:
+        provider.add_span_processor(BatchSpanProcessor(_exporter_from_path(exporter)))
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter}")
+    trace.set_tracer_provider(provider)
+    _configured = True
+    logger.info(f"tracing.enabled: service={service_name}, exporter={exporter}")
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, joined to any incoming traceparent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in _UNTRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.method": method, "http.target": scope["path"]},
+        ) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # FastAPI records the matched route once routing is done.
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.update_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
+
+
+def trace_engine(engine):
+    """Open a client span around every SQL statement run on an engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, _cursor, statement, _parameters, _context, _executemany):
+        verb = statement.split(None, 1)[0].upper() if statement.strip() else "SQL"
+        span = tracer.start_span(
+            f"db {verb}",
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": engine.dialect.name, "db.statement": statement[:_MAX_STATEMENT_LENGTH]},
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, *_):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().end()
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+            span.end()
+
+
+def _k8s_span(resource_path: str, method: str, args: tuple, kwargs: dict):
+    path_params = (args[0] if args else kwargs.get("path_params")) or {}
+    attributes = {"http.method": method, "k8s.path": resource_path}
+    for key in ("namespace", "name"):
+        if path_params.get(key):
+            attributes[f"k8s.{key}"] = path_params[key]
+    return tracer.start_as_current_span(
+        f"k8s {method} {k8s_path_template(resource_path)}",
+        kind=SpanKind.CLIENT,
+        attributes=attributes,
+    )
+
+
+def trace_api_client(api_client):
+    """Open a client span around every request made through a kubernetes ApiClient."""
+    call_api = api_client.call_api
+
+    def traced_call_api(resource_path, method, *args, **kwargs):
+        with _k8s_span(resource_path, method, args, kwargs):
+            return call_api(resource_path, method, *args, **kwargs)
+
+    api_client.call_api = traced_call_api
+    return api_client
+
+
+def trace_async_api_client(api_client):
+    """trace_api_client for kubernetes_asyncio clients."""
+    call_api = api_client.call_api
+
+    async def traced_call_api(resource_path, method, *args, **kwargs):
+        with _k8s_span(resource_path, method, args, kwargs):
+            return await call_api(resource_path, method, *args, **kwargs)
+
+    api_client.call_api = traced_call_api
+    return api_client
+
+
+def helm_span(command: list[str]):
+    return tracer.start_as_current_span(
+        f"helm {command[1]}",
+        kind=SpanKind.CLIENT,
+        attributes={"helm.command": " ".join(command)},
+    )
+
+
+class _RequestGetter(Getter):
+    """Reads propagated headers off a Celery task request."""
+
+    def get(self, carrier: Any, key: str) -> list[str] | None:
+        value = getattr(carrier, key, None)
+        return [value] if isinstance(value, str) else None
+
+    def keys(self, carrier: Any) -> list[str]:
+        return []
+
+
+_REQUEST_GETTER = _RequestGetter()
+
+
+def _eta_timestamp(eta: Any) -> float:
+    if isinstance(eta, str):
+        try:
+            return datetime.fromisoformat(eta).timestamp()
+        except ValueError:
+            return 0.0
+    if isinstance(eta, datetime):
+        return eta.timestamp()
+    return 0.0
+
+
+def trace_celery(celery_app):
+    """Carry the trace context through task messages and span each task run.
+
+    Every run gets a celery.queue_wait span covering the time between publish
+    (or the countdown's eta) and the worker picking the message up.
+    """
+    from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun, worker_init
+
+    runs: dict[str, tuple[trace.Span, object]] = {}
+
+    @before_task_publish.connect(weak=False)
+    def _inject(headers=None, **_):
+        if headers is None:
+            return
+        propagate.inject(headers)
+        headers["trace_published_at"] = time.time()
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task_id=None, task=None, **_):
+        if task is None:
+            return
+        request = task.request
+        parent = propagate.extract(request, getter=_REQUEST_GETTER)
+        published_at = getattr(request, "trace_published_at", None)
+        if isinstance(published_at, (int, float)):
+            now = time.time_ns()
+            queued_from = int(max(published_at, _eta_timestamp(request.eta)) * 1e9)
+            wait = tracer.start_span(
+                "celery.queue_wait",
+                context=parent,
+                start_time=min(queued_from, now),
+                attributes={"celery.task": task.name},
+            )
+            wait.end(end_time=now)
+        span = tracer.start_span(
+            f"celery.run {task.name}",
+            context=parent,
+            kind=SpanKind.CONSUMER,
+            attributes={"celery.task": task.name, "celery.task_id": task_id, "celery.retries": request.retries or 0},
+        )
+        runs[task_id] = (span, otel_context.attach(trace.set_span_in_context(span)))
+
+    @task_failure.connect(weak=False)
+    def _task_failed(task_id=None, exception=None, **_):
+        run = runs.get(task_id)
+        if run is not None and exception is not None:
+            run[0].record_exception(exception)
+            run[0].set_status(trace.Status(trace.StatusCode.ERROR))
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task_id=None, state=None, **_):
+        run = runs.pop(task_id, None)
+        if run is None:
+            return
+        span, token = run
+        span.set_attribute("celery.state", state or "UNKNOWN")
+        otel_context.detach(token)
+        span.end()
+
+    @worker_init.connect(weak=False)
+    def _setup(**_):
+        setup_tracing("platform-worker")
@@ -1,4 +1,4 @@
 from app.db.base import Base
-from app.db.session import engine, SessionLocal, get_db
+from app.db.session import engine, SessionLocal, get_db, async_engine, AsyncSessionLocal, get_async_db
 
-__all__ = ["Base", "engine", "SessionLocal", "get_db"]
+__all__ = ["Base", "engine", "SessionLocal", "get_db", "async_engine", "AsyncSessionLocal", "get_async_db"]
@@ -1,18 +1,36 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import TimedAsyncQueuePool, TimedQueuePool
+from app.core.tracing import trace_engine
 
 
+# Workers and scripts use the blocking engine; API routes use async_engine.
 engine = create_engine(
     settings.database_url,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
 )
+trace_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    settings.database_url,
+    poolclass=TimedAsyncQueuePool,
+    pool_pre_ping=True,
+    pool_size=settings.async_db_pool_size,
+    max_overflow=settings.async_db_max_overflow,
+)
+trace_engine(async_engine.sync_engine)
+
+# Objects stay usable after commit; async sessions cannot lazy-load expired attributes.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     db = SessionLocal()
@@ -22,6 +40,11 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     from app.db.base import Base
     from app import models  # noqa: F401
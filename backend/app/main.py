@@ -1,16 +1,21 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from http import HTTPStatus
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app.schemas.store import ErrorResponse
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.core.tracing import TracingMiddleware, setup_tracing
 from app.db.session import init_db
+from app.services.audit import audit_sink
 
 from app.api.router import api_router
 
 
+setup_tracing("platform-api")
 app = FastAPI(title="Store Provisioning Platform")
 app.add_middleware(
     CORSMiddleware,
@@ -18,13 +23,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 app.include_router(api_router)
 
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    audit_sink.recover_replays()
+    audit_sink.replay_spool()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    audit_sink.close()
 
 
 @app.get("/health")
@@ -32,11 +47,16 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.exception_handler(HTTPException)
 def http_exception_handler(_: Request, exc: HTTPException):
     name = HTTPStatus(exc.status_code).phrase if exc.status_code in HTTPStatus._value2member_map_ else "Error"
     payload = ErrorResponse(error=name, detail=str(exc.detail))
-    return JSONResponse(status_code=exc.status_code, content=payload.model_dump())
+    return JSONResponse(status_code=exc.status_code, content=payload.model_dump(), headers=exc.headers)
 
 
 @app.exception_handler(RequestValidationError)
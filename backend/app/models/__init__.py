@@ -2,10 +2,14 @@ from app.models.user import UserORM
 from app.models.store import StoreORM
 from app.models.audit_log import AuditLogORM
 from app.models.rate_limit import RateLimitORM
+from app.models.provisioning import StoreProvisioningORM
+from app.models.phase_timing import StorePhaseTimingORM
 
 __all__ = [
     "UserORM",
     "StoreORM",
     "AuditLogORM",
     "RateLimitORM",
+    "StoreProvisioningORM",
+    "StorePhaseTimingORM",
 ]
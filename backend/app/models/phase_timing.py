@@ -0,0 +1,26 @@
+from datetime import datetime
+import uuid
+
+from sqlalchemy import Boolean, DateTime, Float, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StorePhaseTimingORM(Base):
+    __tablename__ = "store_phase_timings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Not a foreign key: timings outlive the store rows they describe.
+    store_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+    operation: Mapped[str] = mapped_column(String(20), nullable=False)
+    phase: Mapped[str] = mapped_column(String(40), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    succeeded: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    __table_args__ = (
+        Index("ix_store_phase_timings_finished_at", "finished_at"),
+    )
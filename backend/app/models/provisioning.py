@@ -0,0 +1,31 @@
+from datetime import datetime
+import uuid
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class StoreProvisioningORM(Base):
+    __tablename__ = "store_provisioning"
+
+    store_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("stores.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    phase: Mapped[str] = mapped_column(String(30), nullable=False)
+    phase_started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    failures: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    credentials: Mapped[Optional[dict]] = mapped_column(JSONB)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    previous_domain: Mapped[Optional[str]] = mapped_column(String(255))
+    # Where the current phase's watch stopped (resourceVersion and object
+    # snapshots), so the next run resumes it instead of relisting.
+    watch_state: Mapped[Optional[dict]] = mapped_column(JSONB)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -34,6 +34,7 @@ class StoreORM(Base):
     user: Mapped["UserORM"] = relationship("UserORM", back_populates="stores")
 
     __table_args__ = (
-        Index("idx_stores_user_id", "user_id"),
+        # Serves per-user lookups and the keyset order of GET /stores.
+        Index("idx_stores_user_created", "user_id", "created_at", "id"),
         Index("idx_status", "status"),
     )
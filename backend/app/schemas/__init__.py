@@ -1,23 +1,43 @@
 from app.schemas.store import (
     StoreStatus,
+    ProvisioningPhase,
     CreateStoreRequest,
     StoreResponse,
     StoreDetailsResponse,
+    BatchCreateStoresRequest,
+    BatchDeleteStoresRequest,
+    BatchItemStatus,
+    BatchItemResult,
+    BatchResponse,
     HealthStatus,
     ErrorResponse,
 )
 from app.schemas.user import User
+from app.schemas.pool import ClaimLatency, WarmPoolStats
+from app.schemas.timing import TimedOperation, TimedPhase, PhaseTimingStats, PhaseTimingsResponse
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenResponse
 
 __all__ = [
     "StoreStatus",
+    "ProvisioningPhase",
     "CreateStoreRequest",
     "StoreResponse",
     "StoreDetailsResponse",
+    "BatchCreateStoresRequest",
+    "BatchDeleteStoresRequest",
+    "BatchItemStatus",
+    "BatchItemResult",
+    "BatchResponse",
     "HealthStatus",
     "ErrorResponse",
     "User",
     "RegisterRequest",
     "LoginRequest",
     "TokenResponse",
+    "ClaimLatency",
+    "WarmPoolStats",
+    "TimedOperation",
+    "TimedPhase",
+    "PhaseTimingStats",
+    "PhaseTimingsResponse",
 ]
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ClaimLatency(BaseModel):
+    samples: int
+    avg_ms: Optional[float] = None
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+
+
+class WarmPoolStats(BaseModel):
+    target_size: int
+    ready: int
+    provisioning: int
+    hits: int
+    misses: int
+    hit_rate: Optional[float] = None
+    claim_latency: ClaimLatency
@@ -1,5 +1,6 @@
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 from typing import Dict, List, Optional
 from uuid import UUID
 
@@ -15,6 +16,34 @@ class StoreStatus(str, Enum):
     DELETING = "Deleting"
 
 
+class ProvisioningPhase(str, Enum):
+    ADMISSION = "admission"
+    NAMESPACE = "namespace"
+    CHART = "chart"
+    INSTALL_JOB = "install_job"
+    PODS = "pods"
+    REBIND = "rebind"
+    REBIND_JOB = "rebind_job"
+    DONE = "done"
+
+
+@lru_cache(maxsize=256)
+def _url_scheme(domain_suffix: str, tls_enabled: bool) -> str:
+    if not tls_enabled:
+        return "http"
+    domain_suffix = f".{domain_suffix}"
+    if domain_suffix.endswith(".localtest.me") or domain_suffix.endswith(".localhost"):
+        return "http"
+    if domain_suffix.endswith(".nip.io") or domain_suffix.endswith(".sslip.io"):
+        return "http"
+    return "https"
+
+
+def store_scheme(domain: str) -> str:
+    """URL scheme for a store domain, decided once per parent domain."""
+    return _url_scheme(domain.partition(".")[2], settings.tls_enabled)
+
+
 class CreateStoreRequest(BaseModel):
     name: str = Field(min_length=3, max_length=63, pattern=r"^[a-z0-9-]+$")
     domain: Optional[str] = Field(default=None, pattern=r"^[a-z0-9.-]+\.[a-z]{2,}$")
@@ -30,13 +59,7 @@ class StoreResponse(BaseModel):
 
     @staticmethod
     def _scheme(domain: str) -> str:
-        if not settings.tls_enabled:
-            return "http"
-        if domain.endswith(".localtest.me") or domain.endswith(".localhost"):
-            return "http"
-        if domain.endswith(".nip.io") or domain.endswith(".sslip.io"):
-            return "http"
-        return "https"
+        return store_scheme(domain)
 
     @model_validator(mode="after")
     def set_url(self):
@@ -60,6 +83,33 @@ class StoreDetailsResponse(StoreResponse):
         return self
 
 
+class BatchCreateStoresRequest(BaseModel):
+    stores: List[CreateStoreRequest] = Field(min_length=1, max_length=50)
+
+
+class BatchDeleteStoresRequest(BaseModel):
+    store_ids: List[UUID] = Field(min_length=1, max_length=100)
+
+
+class BatchItemStatus(str, Enum):
+    ACCEPTED = "accepted"
+    REJECTED = "rejected"
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: BatchItemStatus
+    store_id: Optional[UUID] = None
+    store: Optional[StoreResponse] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BatchItemResult]
+
+
 class HealthStatus(BaseModel):
     healthy: bool
     wordpress_ready: bool
@@ -67,6 +117,10 @@ class HealthStatus(BaseModel):
     details: Optional[str] = None
 
 
+class StoreHealthStatus(HealthStatus):
+    store_id: UUID
+
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
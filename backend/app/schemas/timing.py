@@ -0,0 +1,42 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class TimedOperation(str, Enum):
+    PROVISION = "provision"
+    DELETE = "delete"
+
+
+class TimedPhase(str, Enum):
+    ADMISSION_WAIT = "admission_wait"
+    ENSURE_NAMESPACE = "ensure_namespace"
+    HELM_INSTALL = "helm_install"
+    INSTALL_JOB_WAIT = "install_job_wait"
+    POD_READINESS = "pod_readiness"
+    REBIND = "rebind"
+    REBIND_JOB_WAIT = "rebind_job_wait"
+    NAMESPACE_DELETE = "namespace_delete"
+    NAMESPACE_TERMINATION = "namespace_termination"
+    DB_COMMIT = "db_commit"
+
+
+class PhaseTimingStats(BaseModel):
+    operation: TimedOperation
+    phase: TimedPhase
+    count: int
+    failed: int
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    # Cumulative bucket counts keyed by upper bound in seconds ("+Inf" last).
+    histogram: dict[str, int]
+
+
+class PhaseTimingsResponse(BaseModel):
+    window_minutes: int
+    since: datetime
+    phases: list[PhaseTimingStats]
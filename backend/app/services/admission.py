@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from kubernetes.client import ApiException
+from kubernetes.utils import parse_quantity
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.services.k8s_client import K8sClient
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger("admission")
+
+# Stores holding a provisioning slot, scored by lease expiry.
+ACTIVE_KEY = "provision:active"
+# Stores waiting for a slot, scored by when they first asked (FIFO).
+WAITING_KEY = "provision:waiting"
+# The same stores scored by their latest admission check; a store that has not
+# checked for a lease period (crashed worker, lost task) leaves the queue.
+WAITING_SEEN_KEY = "provision:waiting_seen"
+# Estimated start time (ISO 8601) of each waiting store.
+ETA_KEY = "provision:eta"
+
+# Pods of a running store whose requests admission reserves capacity for.
+STORE_COMPONENTS = ("mysql", "wordpress")
+
+# Admits a store if it already holds a slot, or if it is within the first
+# free slots of the waiting queue. Expired slots and waiting stores not seen
+# since ARGV[5] are dropped first. Returns {admitted, stores ahead of it}.
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+for _, stale in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[5])) do
+  redis.call('ZREM', KEYS[2], stale)
+  redis.call('HDEL', KEYS[4], stale)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[5])
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+  redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+  redis.call('ZREM', KEYS[2], ARGV[1])
+  redis.call('ZREM', KEYS[3], ARGV[1])
+  return {1, 0}
+end
+redis.call('ZADD', KEYS[2], 'NX', ARGV[2], ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+local free = tonumber(ARGV[4]) - redis.call('ZCARD', KEYS[1])
+local rank = redis.call('ZRANK', KEYS[2], ARGV[1])
+if rank < free then
+  redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+  redis.call('ZREM', KEYS[2], ARGV[1])
+  redis.call('ZREM', KEYS[3], ARGV[1])
+  return {1, 0}
+end
+return {0, rank - math.max(free, 0)}
+"""
+
+_lock = threading.Lock()
+# (taken_at, free capacity) from the last cluster read; admissions made since
+# are subtracted locally so one worker does not over-admit between reads.
+_free_snapshot: tuple[float, dict[str, int]] | None = None
+
+
+class Admission:
+    def __init__(self, admitted: bool, ahead: int = 0, estimated_start: datetime | None = None):
+        self.admitted = admitted
+        self.ahead = ahead
+        self.estimated_start = estimated_start
+
+    @property
+    def wait_seconds(self) -> float:
+        if self.estimated_start is None:
+            return 0.0
+        return max(0.0, (self.estimated_start - datetime.now(timezone.utc)).total_seconds())
+
+
+def store_requests(values: dict) -> dict[str, int]:
+    """Sum the cpu (millicores) and memory (bytes) requests of a store's pods."""
+    total = {"cpu": 0, "memory": 0}
+    for component in STORE_COMPONENTS:
+        requests = ((values.get(component) or {}).get("resources") or {}).get("requests") or {}
+        if requests.get("cpu"):
+            total["cpu"] += int(parse_quantity(requests["cpu"]) * 1000)
+        if requests.get("memory"):
+            total["memory"] += int(parse_quantity(requests["memory"]))
+    return total
+
+
+def capacity_stale() -> bool:
+    """True when the cached cluster capacity should be re-read."""
+    return _free_snapshot is None or time.monotonic() - _free_snapshot[0] > settings.admission_capacity_cache_seconds
+
+
+def update_capacity(allocatable: dict[str, int], requested: dict[str, int]):
+    global _free_snapshot
+    with _lock:
+        _free_snapshot = (time.monotonic(), {key: allocatable[key] - requested[key] for key in allocatable})
+
+
+def _capacity_fits(k8s: K8sClient | None, requests: dict[str, int]) -> bool:
+    if k8s is not None and capacity_stale():
+        try:
+            update_capacity(*k8s.cluster_capacity())
+        except ApiException as exc:
+            # Without node access only the concurrency limit applies.
+            logger.warning(f"admission.capacity_unavailable: {exc.status} {exc.reason}")
+            return True
+    with _lock:
+        if _free_snapshot is None:
+            return True
+        free = _free_snapshot[1]
+        return all(free[key] >= requests[key] for key in requests)
+
+
+def _reserve(requests: dict[str, int]):
+    with _lock:
+        if _free_snapshot is not None:
+            free = _free_snapshot[1]
+            for key in requests:
+                free[key] -= requests[key]
+
+
+def admit(store_id: str, requests: dict[str, int], k8s: K8sClient | None = None) -> Admission:
+    """Try to take a provisioning slot for a store.
+
+    A store is admitted when the cluster has room for its requests and one of
+    the provision_max_concurrent slots is free to it in FIFO order. Otherwise it
+    keeps its place in the queue and gets an estimated start time.
+
+    Cluster capacity is re-read through k8s when the cached value is stale; the
+    asyncio runtime passes None and refreshes it with update_capacity() instead.
+    """
+    limit = settings.provision_max_concurrent if _capacity_fits(k8s, requests) else 0
+    now = time.time()
+    try:
+        redis_client = get_redis()
+        admitted, ahead = redis_client.eval(
+            _ACQUIRE_SCRIPT,
+            4,
+            ACTIVE_KEY,
+            WAITING_KEY,
+            WAITING_SEEN_KEY,
+            ETA_KEY,
+            store_id,
+            now,
+            now + settings.provision_slot_lease_seconds,
+            limit,
+            now - settings.provision_slot_lease_seconds,
+        )
+    except RedisError as exc:
+        # Fail open: stalling every store on a Redis outage is worse than an
+        # unthrottled burst.
+        logger.warning(f"admission.redis_unavailable: {exc}")
+        return Admission(admitted=True)
+
+    if admitted:
+        _reserve(requests)
+        _set_eta(store_id, None)
+        logger.info("admission.admitted", extra={"store_id": store_id})
+        return Admission(admitted=True)
+
+    # Slots free up in waves of provision_max_concurrent stores.
+    waves = int(ahead) // max(1, settings.provision_max_concurrent) + 1
+    estimated_start = datetime.now(timezone.utc) + timedelta(seconds=waves * settings.provision_estimated_seconds)
+    _set_eta(store_id, estimated_start)
+    logger.info(
+        "admission.queued",
+        extra={
+            "store_id": store_id,
+            "ahead": int(ahead),
+            "capacity_short": limit == 0,
+            "estimated_start": estimated_start.isoformat(),
+        },
+    )
+    return Admission(admitted=False, ahead=int(ahead), estimated_start=estimated_start)
+
+
+def _set_eta(store_id: str, estimated_start: datetime | None):
+    try:
+        if estimated_start is None:
+            get_redis().hdel(ETA_KEY, store_id)
+        else:
+            get_redis().hset(ETA_KEY, store_id, estimated_start.isoformat())
+    except RedisError as exc:
+        # Only the displayed estimate is affected; admission itself already happened.
+        logger.warning(f"admission.eta_update_failed: {exc}")
+
+
+def refresh(store_id: str):
+    """Extend the lease of a store that holds a slot; no-op otherwise."""
+    try:
+        get_redis().zadd(ACTIVE_KEY, {store_id: time.time() + settings.provision_slot_lease_seconds}, xx=True)
+    except RedisError as exc:
+        logger.warning(f"admission.refresh_failed: {exc}")
+
+
+def release(store_id: str):
+    """Give up a store's slot or queue position."""
+    try:
+        pipe = get_redis().pipeline()
+        pipe.zrem(ACTIVE_KEY, store_id)
+        pipe.zrem(WAITING_KEY, store_id)
+        pipe.zrem(WAITING_SEEN_KEY, store_id)
+        pipe.hdel(ETA_KEY, store_id)
+        pipe.execute()
+    except RedisError as exc:
+        logger.warning(f"admission.release_failed: {exc}")
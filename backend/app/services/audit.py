@@ -1,12 +1,190 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
 from typing import Any
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.db.session import SessionLocal
 from app.models.audit_log import AuditLogORM
 
+logger = logging.getLogger("audit")
 
-def log_audit(
-    db: Session,
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class AuditSink:
+    """Buffers audit rows in-process and writes them in multi-row INSERTs.
+
+    A background thread flushes once batch_size rows are waiting or every
+    flush_interval seconds. Rows that cannot be written (database down, or
+    still buffered when close() gives up) are appended to spool_path as JSON
+    lines and replayed after the next successful write or at startup.
+    Malformed spool lines (e.g. half-written before a crash) are skipped.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, spool_path: str):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self._rows: list[dict] = []
+        self._condition = threading.Condition()
+        self._spool_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def submit(self, row: dict):
+        with self._condition:
+            if self._closed:
+                # Late entries after shutdown started go straight to the spool.
+                self._spool([row])
+                return
+            self._rows.append(row)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            if len(self._rows) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closed and len(self._rows) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                rows, self._rows = self._rows, []
+                closed = self._closed
+            if rows:
+                try:
+                    self._write(rows)
+                except Exception:
+                    # The thread is never restarted, so nothing may escape it.
+                    logger.exception("audit.flush_error", extra={"rows": len(rows)})
+            if closed:
+                return
+
+    def _write(self, rows: list[dict]) -> bool:
+        try:
+            with SessionLocal() as db:
+                db.execute(insert(AuditLogORM), rows)
+                db.commit()
+        except Exception as exc:
+            logger.warning(f"audit.flush_failed: {exc}", extra={"rows": len(rows)})
+            self._spool(rows)
+            return False
+        try:
+            self.replay_spool()
+        except Exception:
+            logger.exception("audit.replay_error")
+        return True
+
+    def _spool(self, rows: list[dict]):
+        lines = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        with self._spool_lock, open(self.spool_path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+        logger.info("audit.spooled", extra={"rows": len(rows), "path": self.spool_path})
+
+    def replay_spool(self):
+        """Insert rows left in the spool file by an earlier failure or shutdown."""
+        replay_path = f"{self.spool_path}.{os.getpid()}.replay"
+        with self._spool_lock:
+            try:
+                # Claimed by rename so concurrent processes never replay the same rows.
+                os.replace(self.spool_path, replay_path)
+            except FileNotFoundError:
+                return
+        rows = []
+        with open(replay_path, encoding="utf-8") as handle:
+            for number, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(_from_spool(json.loads(line)))
+                except (ValueError, KeyError, TypeError) as exc:
+                    logger.warning(f"audit.spool_line_skipped: {exc}", extra={"path": self.spool_path, "line": number})
+        try:
+            with SessionLocal() as db:
+                if rows:
+                    db.execute(insert(AuditLogORM), rows)
+                db.commit()
+        except Exception as exc:
+            logger.warning(f"audit.replay_failed: {exc}", extra={"rows": len(rows)})
+            self._spool(rows)
+        else:
+            logger.info("audit.replayed", extra={"rows": len(rows)})
+        os.remove(replay_path)
+
+    def recover_replays(self):
+        """Return rows from replays cut short by a crash to the spool; call at startup.
+
+        A replay file whose process is still running is left alone.
+        """
+        for replay_path in glob.glob(f"{glob.escape(self.spool_path)}.*.replay"):
+            pid = replay_path[len(self.spool_path) + 1 : -len(".replay")]
+            if pid.isdigit() and int(pid) != os.getpid() and _pid_alive(int(pid)):
+                continue
+            with open(replay_path, encoding="utf-8") as handle:
+                lines = handle.read()
+            if lines and not lines.endswith("\n"):
+                lines += "\n"
+            with self._spool_lock:
+                with open(self.spool_path, "a", encoding="utf-8") as handle:
+                    handle.write(lines)
+                os.remove(replay_path)
+            logger.info("audit.replay_recovered", extra={"path": replay_path})
+
+    def close(self, timeout: float = 10.0):
+        """Flush buffered rows and stop the thread; leftovers are spooled."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._condition:
+            rows, self._rows = self._rows, []
+        if rows:
+            self._spool(rows)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _from_spool(row: dict) -> dict:
+    for key in ("user_id", "resource_id"):
+        if row.get(key):
+            row[key] = uuid.UUID(row[key])
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+audit_sink = AuditSink(
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+    spool_path=settings.audit_spool_path,
+)
+
+
+async def log_audit(
+    db: AsyncSession,
     user_id,
     action: str,
     resource_type: str | None = None,
@@ -14,13 +192,18 @@ def log_audit(
     details: dict[str, Any] | None = None,
     ip_address: str | None = None,
 ):
-    entry = AuditLogORM(
-        user_id=user_id,
-        action=action,
-        resource_type=resource_type,
-        resource_id=resource_id,
-        details=details,
-        ip_address=ip_address,
-    )
-    db.add(entry)
-    db.commit()
+    """Record an audit entry; with APP_AUDIT_MODE=inline it is committed on db before returning."""
+    row = {
+        "user_id": user_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "details": details,
+        "ip_address": ip_address,
+        "created_at": _utcnow(),
+    }
+    if settings.audit_mode == "inline":
+        db.add(AuditLogORM(**row))
+        await db.commit()
+        return
+    audit_sink.submit(row)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from app.services.helm_client import HelmClient, get_helm_client
+
+logger = logging.getLogger("chart_renderer")
+
+# Values that differ for every store. They are rendered as placeholder tokens so
+# a single `helm template` run can be reused for every store that shares the same
+# chart version and profile values. Any string below one of these paths is a
+# per-store value.
+PER_STORE_PATHS: tuple[tuple[str, ...], ...] = (
+    ("storeName",),
+    ("storeId",),
+    ("domain",),
+    ("namespace", "name"),
+    ("mysql", "rootPassword"),
+    ("mysql", "password"),
+    ("wordpress", "adminPassword"),
+    ("wordpress", "siteTitle"),
+    ("wordpress", "siteUrl"),
+    ("wordpress", "salts"),
+    ("rebind", "fromUrl"),
+)
+
+_TOKEN_RE = re.compile(r"URUMIPH\d{3}X")
+
+# Mirrors helm's install order so dependencies exist before their dependents.
+KIND_ORDER = [
+    "Namespace",
+    "NetworkPolicy",
+    "ResourceQuota",
+    "LimitRange",
+    "ServiceAccount",
+    "Secret",
+    "ConfigMap",
+    "PersistentVolumeClaim",
+    "Role",
+    "RoleBinding",
+    "Service",
+    "Deployment",
+    "HorizontalPodAutoscaler",
+    "Ingress",
+    "Job",
+]
+
+
+def _token(index: int) -> str:
+    return f"URUMIPH{index:03d}X"
+
+
+def _is_per_store(path: tuple[str, ...]) -> bool:
+    return any(path[: len(prefix)] == prefix for prefix in PER_STORE_PATHS)
+
+
+def _tokenize(values: dict) -> tuple[dict, dict[str, str]]:
+    """Replace per-store strings with tokens; returns (tokenized values, token -> value)."""
+    substitutions: dict[str, str] = {}
+
+    def walk(node: Any, path: tuple[str, ...]) -> Any:
+        if isinstance(node, dict):
+            return {key: walk(node[key], path + (key,)) for key in sorted(node)}
+        if isinstance(node, str) and _is_per_store(path):
+            token = _token(len(substitutions))
+            substitutions[token] = node
+            return token
+        return node
+
+    return walk(values, ()), substitutions
+
+
+def _substitute(node: Any, substitutions: dict[str, str]) -> Any:
+    if isinstance(node, dict):
+        return {key: _substitute(value, substitutions) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_substitute(item, substitutions) for item in node]
+    if isinstance(node, str) and "URUMIPH" in node:
+        return _TOKEN_RE.sub(lambda match: substitutions[match.group(0)], node)
+    return node
+
+
+def _kind_rank(manifest: dict) -> int:
+    kind = manifest.get("kind", "")
+    return KIND_ORDER.index(kind) if kind in KIND_ORDER else len(KIND_ORDER)
+
+
+class ChartRenderer:
+    """Renders the store chart once per chart version and fills in per-store values.
+
+    `helm template` only runs when the chart version or the non per-store values
+    (profile, TLS, feature flags) change; every other store reuses the cached
+    manifests with its own values substituted in.
+    """
+
+    def __init__(self, chart_path: str, helm: HelmClient | None = None):
+        self.chart_path = chart_path
+        self.helm = helm or get_helm_client()
+        self._cache: dict[str, list[dict]] = {}
+        self._lock = threading.Lock()
+
+    def chart_version(self) -> str:
+        with (Path(self.chart_path) / "Chart.yaml").open("r", encoding="utf-8") as handle:
+            chart = yaml.safe_load(handle) or {}
+        return str(chart.get("version", "0"))
+
+    def render(self, values: dict) -> list[dict]:
+        tokenized, substitutions = _tokenize(values)
+        key = hashlib.sha256(
+            json.dumps([self.chart_version(), tokenized], sort_keys=True).encode()
+        ).hexdigest()
+
+        with self._lock:
+            manifests = self._cache.get(key)
+            if manifests is None:
+                manifests = self._render_template(tokenized)
+                self._cache[key] = manifests
+                logger.info(f"chart_rendered: key={key[:12]}, manifests={len(manifests)}")
+
+        rendered = [_substitute(manifest, substitutions) for manifest in manifests]
+        return sorted(rendered, key=_kind_rank)
+
+    def _render_template(self, tokenized: dict) -> list[dict]:
+        output = self.helm.template("store", self.chart_path, tokenized)
+        return [doc for doc in yaml.safe_load_all(output) if doc]
+
+
+_renderers: dict[str, ChartRenderer] = {}
+
+
+def get_chart_renderer(chart_path: str) -> ChartRenderer:
+    renderer = _renderers.get(chart_path)
+    if renderer is None:
+        renderer = _renderers.setdefault(chart_path, ChartRenderer(chart_path))
+    return renderer
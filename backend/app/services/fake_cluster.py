@@ -0,0 +1,347 @@
+"""In-process stand-ins for HelmClient and K8sClient (APP_CLUSTER_BACKEND=fake).
+
+FakeCluster keeps namespaces, releases, jobs and pods in memory and plays out
+their lifecycle from a SimulationProfile: helm and API latency, image pulls,
+pods stuck pending, install job runtime and failures, and namespace
+termination. Every latency is multiplied by the profile's time_scale so hours
+of provisioning can be compressed into minutes. Calls block for their sampled
+latency, so worker slots are held the way they are against a real cluster.
+
+scripts/simulate_provisioning.py drives the real Celery tasks against it.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, List
+
+import yaml
+
+from app.core.config import settings
+from app.services.helm_client import HelmClient
+from app.services.k8s_client import FIELD_MANAGER, K8sClient
+
+logger = logging.getLogger("fake_cluster")
+
+STORE_APPS = ("mysql", "wordpress")
+
+
+class Latency:
+    """Triangular distribution of a latency in (unscaled) seconds."""
+
+    def __init__(self, low: float, mode: float, high: float):
+        self.low = low
+        self.mode = mode
+        self.high = high
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.triangular(self.low, self.high, self.mode)
+
+    def to_list(self) -> list[float]:
+        return [self.low, self.mode, self.high]
+
+
+class SimulationProfile:
+    """Latency and failure distributions of the simulated cluster.
+
+    Latencies are (low, mode, high) seconds; rates are probabilities per store.
+    """
+
+    LATENCIES = {
+        "api": (0.005, 0.01, 0.05),
+        "helm_install": (2, 4, 15),
+        "helm_uninstall": (1, 2, 5),
+        "helm_template": (0.5, 1, 2),
+        "image_pull": (5, 20, 120),
+        "pod_start": (5, 10, 30),
+        "pending": (60, 180, 600),
+        "install_job": (60, 120, 300),
+        "rebind_job": (10, 20, 60),
+        "namespace_deletion": (10, 30, 120),
+    }
+    RATES = {
+        "job_failure_rate": 0.02,
+        "pod_pending_rate": 0.01,
+    }
+
+    def __init__(self, time_scale: float = 1.0, seed: int | None = None, **overrides: Any):
+        self.time_scale = time_scale
+        self.seed = seed
+        self.latencies = {name: Latency(*bounds) for name, bounds in self.LATENCIES.items()}
+        self.rates = dict(self.RATES)
+        # Cluster size reported to admission, and what each store requests.
+        self.allocatable = {"cpu": 64_000, "memory": 256 * 1024**3}
+        self.store_requests = {"cpu": 750, "memory": 1536 * 1024**2}
+        for name, value in overrides.items():
+            if name in self.latencies:
+                self.latencies[name] = Latency(*value)
+            elif name in self.rates:
+                self.rates[name] = float(value)
+            elif name in ("allocatable", "store_requests"):
+                setattr(self, name, {key: int(amount) for key, amount in value.items()})
+            else:
+                raise ValueError(f"Unknown simulation setting: {name}")
+
+    @classmethod
+    def from_file(cls, path: str) -> "SimulationProfile":
+        with open(path, "r", encoding="utf-8") as handle:
+            return cls(**json.load(handle))
+
+    def to_dict(self) -> dict:
+        return {
+            "time_scale": self.time_scale,
+            "seed": self.seed,
+            **{name: latency.to_list() for name, latency in self.latencies.items()},
+            **self.rates,
+            "allocatable": self.allocatable,
+            "store_requests": self.store_requests,
+        }
+
+
+class FakeCluster:
+    """Shared in-memory cluster state; every fake client of a process uses one."""
+
+    def __init__(self, profile: SimulationProfile | None = None):
+        self.profile = profile or SimulationProfile()
+        self._rng = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+        # namespace -> monotonic time its deletion finishes (None while active)
+        self.namespaces: dict[str, float | None] = {}
+        self.releases: set[tuple[str, str]] = set()
+        # (namespace, job) -> {"done_at": float, "failed": bool}
+        self.jobs: dict[tuple[str, str], dict[str, Any]] = {}
+        # namespace -> {app: monotonic time its pods are ready}
+        self.pods: dict[str, dict[str, float]] = {}
+        self.stats = {"installs": 0, "job_failures": 0, "pending_pods": 0, "namespace_deletions": 0}
+
+    def sample(self, name: str) -> float:
+        with self._lock:
+            return self.profile.latencies[name].sample(self._rng) * self.profile.time_scale
+
+    def chance(self, rate: str) -> bool:
+        with self._lock:
+            return self._rng.random() < self.profile.rates[rate]
+
+    def delay(self, name: str):
+        time.sleep(self.sample(name))
+
+    def _reap(self, namespace: str):
+        """Drop a namespace whose termination has finished; caller holds the lock."""
+        deleted_at = self.namespaces.get(namespace)
+        if deleted_at is not None and deleted_at <= time.monotonic():
+            del self.namespaces[namespace]
+            self.pods.pop(namespace, None)
+            self.releases = {release for release in self.releases if release[0] != namespace}
+            self.jobs = {key: job for key, job in self.jobs.items() if key[0] != namespace}
+
+    def namespace_active(self, namespace: str) -> bool:
+        with self._lock:
+            self._reap(namespace)
+            return namespace in self.namespaces
+
+    def install(self, namespace: str, release: str | None, job_names: list[str]):
+        """Schedule a store's pods and jobs as if its chart had just been applied."""
+        now = time.monotonic()
+        pull = self.sample("image_pull")
+        pending = self.sample("pending") if self.chance("pod_pending_rate") else 0.0
+        ready = {app: now + pull + pending + self.sample("pod_start") for app in STORE_APPS}
+        jobs = {}
+        for job_name in job_names:
+            runtime = self.sample("install_job" if job_name == _install_job_name() else "rebind_job")
+            jobs[(namespace, job_name)] = {"done_at": ready["mysql"] + runtime, "failed": self.chance("job_failure_rate")}
+        with self._lock:
+            self.namespaces.setdefault(namespace, None)
+            if release:
+                self.releases.add((namespace, release))
+            self.pods[namespace] = ready
+            for key, job in jobs.items():
+                # An existing job is immutable; only a deleted one is recreated.
+                self.jobs.setdefault(key, job)
+            self.stats["installs"] += 1
+            self.stats["pending_pods"] += bool(pending)
+            self.stats["job_failures"] += sum(job["failed"] for job in jobs.values())
+        logger.info("fake_cluster.install", extra={"namespace": namespace, "jobs": job_names, "pending": bool(pending)})
+
+    def wait_until(self, ready_at: float | None, timeout: float) -> bool:
+        """Sleep until ready_at, or for timeout seconds if that comes first."""
+        if ready_at is None:
+            time.sleep(timeout)
+            return False
+        remaining = ready_at - time.monotonic()
+        if remaining > timeout:
+            time.sleep(timeout)
+            return False
+        time.sleep(max(0.0, remaining))
+        return True
+
+
+def _install_job_name() -> str:
+    from app.tasks.store_tasks import INSTALL_JOB_NAME
+
+    return INSTALL_JOB_NAME
+
+
+def _job_names(values: dict) -> list[str]:
+    from app.tasks.store_tasks import INSTALL_JOB_NAME, REBIND_JOB_NAME
+
+    names = []
+    if (values.get("installJob") or {}).get("enabled", True):
+        names.append(INSTALL_JOB_NAME)
+    if (values.get("rebind") or {}).get("enabled"):
+        names.append(REBIND_JOB_NAME)
+    return names
+
+
+class FakeK8sClient(K8sClient):
+    """K8sClient backed by a FakeCluster instead of the API server."""
+
+    def __init__(self, cluster: "FakeCluster | None" = None):
+        self.cluster = cluster or get_fake_cluster()
+
+    def apply_manifests(self, manifests: List[dict], field_manager: str = FIELD_MANAGER):
+        self.cluster.delay("api")
+        namespaces = {(m.get("metadata") or {}).get("namespace") for m in manifests} - {None}
+        jobs = [m["metadata"]["name"] for m in manifests if m.get("kind") == "Job"]
+        for namespace in namespaces:
+            self.cluster.install(namespace, None, jobs)
+
+    def get_pod_status(self, namespace: str, label_selector: str) -> List[dict]:
+        self.cluster.delay("api")
+        app = label_selector.partition("=")[2]
+        ready_at = self.cluster.pods.get(namespace, {}).get(app)
+        if ready_at is None:
+            return []
+        return [{"name": f"{app}-0", "ready": ready_at <= time.monotonic()}]
+
+    def get_pod_statuses(self, namespaces: set[str], apps: List[str]) -> dict[str, dict[str, List[bool]]]:
+        self.cluster.delay("api")
+        now = time.monotonic()
+        return {
+            namespace: {app: [ready_at <= now] for app, ready_at in self.cluster.pods.get(namespace, {}).items() if app in apps}
+            for namespace in namespaces
+        }
+
+    def namespace_exists(self, namespace: str) -> bool:
+        self.cluster.delay("api")
+        return self.cluster.namespace_active(namespace)
+
+    def ensure_namespace(self, namespace: str):
+        self.cluster.delay("api")
+        with self.cluster._lock:
+            self.cluster._reap(namespace)
+            self.cluster.namespaces.setdefault(namespace, None)
+
+    def delete_namespace(self, namespace: str, propagation_policy: str | None = None):
+        self.cluster.delay("api")
+        termination = self.cluster.sample("namespace_deletion")
+        with self.cluster._lock:
+            if namespace in self.cluster.namespaces and self.cluster.namespaces[namespace] is None:
+                self.cluster.namespaces[namespace] = time.monotonic() + termination
+                self.cluster.stats["namespace_deletions"] += 1
+
+    def cluster_capacity(self) -> tuple[dict[str, int], dict[str, int]]:
+        self.cluster.delay("api")
+        profile = self.cluster.profile
+        stores = len(self.cluster.pods)
+        requested = {key: amount * stores for key, amount in profile.store_requests.items()}
+        return dict(profile.allocatable), requested
+
+    def job_failed(self, namespace: str, job_name: str, backoff_limit: int = 5) -> bool:
+        self.cluster.delay("api")
+        job = self.cluster.jobs.get((namespace, job_name))
+        return bool(job and job["failed"] and job["done_at"] <= time.monotonic())
+
+    def delete_job(self, namespace: str, job_name: str):
+        self.cluster.delay("api")
+        with self.cluster._lock:
+            self.cluster.jobs.pop((namespace, job_name), None)
+
+    def wait_for_namespace_deletion(self, namespace: str, timeout: int = 600):
+        with self.cluster._lock:
+            self.cluster._reap(namespace)
+            present = namespace in self.cluster.namespaces
+            deleted_at = self.cluster.namespaces.get(namespace)
+        if present and not self.cluster.wait_until(deleted_at, timeout):
+            raise TimeoutError(f"Namespace {namespace} deletion timed out")
+        self.cluster.namespace_active(namespace)
+
+    def wait_for_job_completion(
+        self,
+        namespace: str,
+        job_name: str,
+        timeout: int = 900,
+        backoff_limit: int = 5,
+        already_waited: float = 0,
+        ready_fallback: bool = True,
+        watch_state: dict | None = None,
+    ):
+        job = self.cluster.jobs.get((namespace, job_name))
+        if not self.cluster.wait_until(job["done_at"] if job else None, timeout):
+            raise TimeoutError(f"Job {job_name} timed out")
+        if job["failed"]:
+            raise RuntimeError(f"Job {job_name} failed")
+
+    def wait_for_pods_ready(self, namespace: str, apps: List[str], timeout: int = 600, watch_state: dict | None = None):
+        pods = self.cluster.pods.get(namespace, {})
+        ready_at = max((pods[app] for app in apps), default=None) if all(app in pods for app in apps) else None
+        if not self.cluster.wait_until(ready_at, timeout):
+            raise TimeoutError("Pods not ready")
+
+
+class FakeHelmClient(HelmClient):
+    """HelmClient backed by a FakeCluster instead of the helm binary."""
+
+    def __init__(self, cluster: "FakeCluster | None" = None):
+        self.cluster = cluster or get_fake_cluster()
+
+    def install(self, release_name: str, chart_path: str, namespace: str, values: dict, wait: bool = True):
+        self.cluster.delay("helm_install")
+        self.cluster.install(namespace, release_name, _job_names(values))
+        if wait:
+            FakeK8sClient(self.cluster).wait_for_pods_ready(namespace, list(STORE_APPS), timeout=1200)
+        return ""
+
+    def uninstall(self, release_name: str, namespace: str):
+        self.cluster.delay("helm_uninstall")
+        with self.cluster._lock:
+            self.cluster.releases.discard((namespace, release_name))
+            self.cluster.pods.pop(namespace, None)
+            self.cluster.jobs = {key: job for key, job in self.cluster.jobs.items() if key[0] != namespace}
+        return ""
+
+    def template(self, release_name: str, chart_path: str, values: dict) -> str:
+        self.cluster.delay("helm_template")
+        namespace = (values.get("namespace") or {}).get("name")
+        manifests = [
+            {"apiVersion": "apps/v1", "kind": "Deployment", "metadata": {"name": app, "namespace": namespace}}
+            for app in STORE_APPS
+        ]
+        manifests += [
+            {"apiVersion": "batch/v1", "kind": "Job", "metadata": {"name": job, "namespace": namespace}}
+            for job in _job_names(values)
+        ]
+        return yaml.safe_dump_all(manifests)
+
+    def list_releases(self, namespace: str) -> List[dict]:
+        return [{"name": release, "namespace": ns} for ns, release in self.cluster.releases if ns == namespace]
+
+
+_cluster: FakeCluster | None = None
+_cluster_lock = threading.Lock()
+
+
+def get_fake_cluster() -> FakeCluster:
+    global _cluster
+    with _cluster_lock:
+        if _cluster is None:
+            path = settings.simulation_profile_path
+            _cluster = FakeCluster(SimulationProfile.from_file(path) if path else None)
+        return _cluster
+
+
+def set_fake_cluster(cluster: FakeCluster):
+    """Replace the process-wide fake cluster (used by the simulator between runs)."""
+    global _cluster
+    with _cluster_lock:
+        _cluster = cluster
@@ -1,44 +1,65 @@
+import asyncio
 import json
 import logging
 import os
+import signal
 import subprocess
 from typing import List
 
+from app.core.config import settings
+from app.core.metrics import time_helm
+from app.core.tracing import helm_span
+
 logger = logging.getLogger("helm_client")
 
 
+def _install_command(release_name: str, chart_path: str, namespace: str, wait: bool) -> tuple[list[str], int]:
+    # Values are streamed over stdin ("-f -") so no per-store file is left on disk.
+    command = [
+        "helm",
+        "upgrade",
+        "--install",
+        release_name,
+        chart_path,
+        "-n",
+        namespace,
+        "-f",
+        "-",
+    ]
+    if not wait:
+        # Only applies the manifests; readiness is tracked by the caller.
+        return command + ["--timeout", "5m"], 330
+    return command + ["--wait", "--timeout", "20m"], 1300
+
+
 class HelmClient:
-    def install(self, release_name: str, chart_path: str, namespace: str, values_path: str):
-        command = [
-            "helm",
-            "upgrade",
-            "--install",
-            release_name,
-            chart_path,
-            "-n",
-            namespace,
-            "-f",
-            values_path,
-            "--wait",
-            "--timeout",
-            "20m",
-        ]
-        return self._run(command, timeout=1300)
+    def install(self, release_name: str, chart_path: str, namespace: str, values: dict, wait: bool = True):
+        command, timeout = _install_command(release_name, chart_path, namespace, wait)
+        return self._run(command, timeout=timeout, input=json.dumps(values))
 
     def uninstall(self, release_name: str, namespace: str):
         command = ["helm", "uninstall", release_name, "-n", namespace]
         return self._run(command, timeout=300)
 
+    def template(self, release_name: str, chart_path: str, values: dict) -> str:
+        command = ["helm", "template", release_name, chart_path, "-f", "-"]
+        return self._run(command, timeout=120, capture_output=True, input=json.dumps(values))
+
     def list_releases(self, namespace: str) -> List[dict]:
         command = ["helm", "list", "-n", namespace, "-o", "json"]
-        output = self._run(command, timeout=60)
+        output = self._run(command, timeout=60, capture_output=True)
         try:
             return json.loads(output)
         except json.JSONDecodeError:
             return []
 
     @staticmethod
-    def _run(command: list[str], timeout: int) -> str:
+    def _run(command: list[str], timeout: int, capture_output: bool = False, input: str | None = None) -> str:
+        with time_helm(command), helm_span(command):
+            return HelmClient._execute(command, timeout, capture_output, input)
+
+    @staticmethod
+    def _execute(command: list[str], timeout: int, capture_output: bool, input: str | None) -> str:
         import time
         import threading
         cmd_str = ' '.join(command)
@@ -51,13 +72,21 @@ class HelmClient:
             logger.info(f"helm_subprocess_start: spawning process")
             process = subprocess.Popen(
                 command,
-                stdout=subprocess.DEVNULL,  # Discard stdout completely
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                # Discard stdout unless the caller needs it (e.g. helm template)
+                stdout=subprocess.PIPE if capture_output else subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
                 text=True,
                 start_new_session=True  # Create new process group for clean termination
             )
             
             logger.info(f"helm_subprocess_spawned: pid={process.pid}")
+
+            if input is not None and process.stdin:
+                try:
+                    process.stdin.write(input)
+                finally:
+                    process.stdin.close()
             
             # Read stderr in a separate thread to avoid blocking
             stderr_lines = []
@@ -74,6 +103,20 @@ class HelmClient:
             stderr_thread = threading.Thread(target=read_stderr)
             stderr_thread.daemon = True
             stderr_thread.start()
+
+            stdout_chunks = []
+            stdout_thread = None
+            if capture_output:
+                def read_stdout():
+                    try:
+                        if process.stdout:
+                            stdout_chunks.append(process.stdout.read())
+                    except Exception as e:
+                        logger.warning(f"stdout_read_error: {e}")
+
+                stdout_thread = threading.Thread(target=read_stdout)
+                stdout_thread.daemon = True
+                stdout_thread.start()
             
             # Wait for process to complete with timeout
             try:
@@ -91,8 +134,10 @@ class HelmClient:
                     process.wait()
                 raise RuntimeError(f"Helm command timed out after {elapsed:.2f}s")
             
-            # Wait for stderr thread to finish
+            # Wait for reader threads to finish
             stderr_thread.join(timeout=5)
+            if stdout_thread:
+                stdout_thread.join(timeout=5)
             
             elapsed = time.time() - start_time
             stderr_output = ''.join(stderr_lines)
@@ -103,7 +148,7 @@ class HelmClient:
                 raise RuntimeError(stderr_output.strip() or "Helm command failed")
             
             logger.info(f"helm_command_success: elapsed={elapsed:.2f}s")
-            return ""
+            return "".join(stdout_chunks)
             
         except RuntimeError:
             raise
@@ -111,3 +156,70 @@ class HelmClient:
             elapsed = time.time() - start_time
             logger.error(f"helm_command_exception: elapsed={elapsed:.2f}s, error={str(e)}")
             raise
+
+
+def get_helm_client() -> HelmClient:
+    """HelmClient for the configured cluster backend."""
+    if settings.cluster_backend == "fake":
+        from app.services.fake_cluster import FakeHelmClient
+
+        return FakeHelmClient()
+    return HelmClient()
+
+
+class AsyncHelmClient:
+    """HelmClient for the asyncio worker runtime; helm runs as an asyncio subprocess."""
+
+    async def install(self, release_name: str, chart_path: str, namespace: str, values: dict, wait: bool = True):
+        command, timeout = _install_command(release_name, chart_path, namespace, wait)
+        return await self._run(command, timeout=timeout, input=json.dumps(values))
+
+    async def uninstall(self, release_name: str, namespace: str):
+        command = ["helm", "uninstall", release_name, "-n", namespace]
+        return await self._run(command, timeout=300)
+
+    async def template(self, release_name: str, chart_path: str, values: dict) -> str:
+        command = ["helm", "template", release_name, chart_path, "-f", "-"]
+        return await self._run(command, timeout=120, input=json.dumps(values))
+
+    @staticmethod
+    async def _run(command: list[str], timeout: int, input: str | None = None) -> str:
+        with time_helm(command), helm_span(command):
+            return await AsyncHelmClient._execute(command, timeout, input)
+
+    @staticmethod
+    async def _execute(command: list[str], timeout: int, input: str | None) -> str:
+        cmd_str = " ".join(command)
+        logger.info(f"helm_command_start: {cmd_str}")
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,  # Create new process group for clean termination
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(input.encode() if input is not None else None),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            elapsed = loop.time() - start_time
+            logger.error(f"helm_command_timeout: elapsed={elapsed:.2f}s, killing pid={process.pid}")
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except (ProcessLookupError, asyncio.TimeoutError):
+                process.kill()
+                await process.wait()
+            raise RuntimeError(f"Helm command timed out after {elapsed:.2f}s")
+
+        elapsed = loop.time() - start_time
+        if process.returncode != 0:
+            stderr_output = stderr.decode(errors="replace")
+            logger.error(f"helm_command_failed: stderr={stderr_output[:500]}")
+            raise RuntimeError(stderr_output.strip() or "Helm command failed")
+        logger.info(f"helm_command_success: elapsed={elapsed:.2f}s")
+        return stdout.decode()
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Any, Awaitable, Callable, List
+
+from aiohttp import ClientError
+from kubernetes_asyncio import client, config, dynamic, watch
+
+from app.core.metrics import instrument_async_api_client
+from app.core.tracing import trace_async_api_client
+from app.services.k8s_client import (
+    FIELD_MANAGER,
+    WATCH_BACKOFF_INITIAL,
+    WATCH_BACKOFF_MAX,
+    WATCH_WINDOW_SECONDS,
+    K8sClient,
+    _bytes,
+    _millicores,
+)
+
+logger = logging.getLogger("k8s_async_client")
+
+
+class AsyncK8sClient:
+    """asyncio counterpart of K8sClient for the asyncio worker runtime.
+
+    One instance (and its connection pool) is shared by every pipeline running
+    on the runtime's event loop. Build it with `await AsyncK8sClient.create()`.
+    """
+
+    def __init__(self, api_client: client.ApiClient):
+        self.api_client = api_client
+        self.core = client.CoreV1Api(api_client)
+        self.batch = client.BatchV1Api(api_client)
+        self._dynamic: dynamic.DynamicClient | None = None
+
+    @classmethod
+    async def create(cls, kubeconfig_path: str | None = None) -> "AsyncK8sClient":
+        if kubeconfig_path:
+            await config.load_kube_config(config_file=kubeconfig_path)
+        else:
+            try:
+                await config.load_kube_config()
+            except config.ConfigException:
+                config.load_incluster_config()
+        return cls(instrument_async_api_client(trace_async_api_client(client.ApiClient())))
+
+    async def close(self):
+        await self.api_client.close()
+
+    async def _dynamic_client(self) -> dynamic.DynamicClient:
+        if self._dynamic is None:
+            self._dynamic = await dynamic.DynamicClient(self.api_client)
+        return self._dynamic
+
+    async def apply_manifests(self, manifests: List[dict], field_manager: str = FIELD_MANAGER):
+        """Server-side apply each manifest, in the order given."""
+        dyn = await self._dynamic_client()
+        for manifest in manifests:
+            resource = await dyn.resources.get(api_version=manifest["apiVersion"], kind=manifest["kind"])
+            metadata = manifest.get("metadata", {})
+            logger.info(f"apply_manifest: kind={manifest['kind']}, name={metadata.get('name')}")
+            await dyn.server_side_apply(
+                resource,
+                body=manifest,
+                namespace=metadata.get("namespace"),
+                field_manager=field_manager,
+                force_conflicts=True,
+            )
+
+    async def namespace_exists(self, namespace: str) -> bool:
+        try:
+            await self.core.read_namespace(namespace)
+            return True
+        except client.ApiException as exc:
+            if exc.status == 404:
+                return False
+            raise
+
+    async def ensure_namespace(self, namespace: str):
+        if await self.namespace_exists(namespace):
+            return
+        body = client.V1Namespace(metadata=client.V1ObjectMeta(name=namespace))
+        await self.core.create_namespace(body)
+
+    async def delete_namespace(self, namespace: str, propagation_policy: str | None = None):
+        try:
+            await self.core.delete_namespace(namespace, propagation_policy=propagation_policy)
+        except client.ApiException as exc:
+            if exc.status == 404:
+                return
+            raise
+
+    async def cluster_capacity(self) -> tuple[dict[str, int], dict[str, int]]:
+        """Return (allocatable, requested); see K8sClient.cluster_capacity."""
+        allocatable = {"cpu": 0, "memory": 0}
+        for node in (await self.core.list_node()).items:
+            if node.spec and node.spec.unschedulable:
+                continue
+            conditions = (node.status.conditions or []) if node.status else []
+            if not any(c.type == "Ready" and c.status == "True" for c in conditions):
+                continue
+            resources = node.status.allocatable or {}
+            allocatable["cpu"] += _millicores(resources.get("cpu"))
+            allocatable["memory"] += _bytes(resources.get("memory"))
+
+        requested = {"cpu": 0, "memory": 0}
+        pods = await self.core.list_pod_for_all_namespaces(
+            field_selector="status.phase!=Succeeded,status.phase!=Failed",
+        )
+        for pod in pods.items:
+            for container in pod.spec.containers or []:
+                requests = (container.resources.requests if container.resources else None) or {}
+                requested["cpu"] += _millicores(requests.get("cpu"))
+                requested["memory"] += _bytes(requests.get("memory"))
+        return allocatable, requested
+
+    async def job_failed(self, namespace: str, job_name: str, backoff_limit: int = 5) -> bool:
+        try:
+            job = await self.batch.read_namespaced_job(job_name, namespace)
+        except client.ApiException as exc:
+            if exc.status == 404:
+                return False
+            raise
+        return bool(job.status and job.status.failed and job.status.failed >= backoff_limit)
+
+    async def delete_job(self, namespace: str, job_name: str):
+        try:
+            await self.batch.delete_namespaced_job(job_name, namespace, propagation_policy="Background")
+        except client.ApiException as exc:
+            if exc.status == 404:
+                return
+            raise
+
+    async def _watch_until(
+        self,
+        list_func: Callable[..., Awaitable[Any]],
+        done: Callable[[dict[str, Any], float], Awaitable[bool]],
+        timeout: float,
+        *args: Any,
+        **list_kwargs: Any,
+    ) -> None:
+        """List then watch until done(objects, elapsed) is true; see K8sClient._watch_until."""
+        start = monotonic()
+        deadline = start + timeout
+        backoff = WATCH_BACKOFF_INITIAL
+        resource_version: str | None = None
+        objects: dict[str, Any] = {}
+
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise TimeoutError("watch timed out")
+            try:
+                if resource_version is None:
+                    listing = await list_func(*args, **list_kwargs)
+                    objects = {item.metadata.name: item for item in listing.items}
+                    resource_version = listing.metadata.resource_version
+                    if await done(objects, monotonic() - start):
+                        return
+
+                window = max(1, min(int(remaining), WATCH_WINDOW_SECONDS))
+                async with watch.Watch().stream(
+                    list_func,
+                    *args,
+                    resource_version=resource_version,
+                    timeout_seconds=window,
+                    _request_timeout=window + 5,
+                    **list_kwargs,
+                ) as stream:
+                    async for event in stream:
+                        obj = event["object"]
+                        resource_version = obj.metadata.resource_version
+                        if event["type"] == "DELETED":
+                            objects.pop(obj.metadata.name, None)
+                        else:
+                            objects[obj.metadata.name] = obj
+                        if await done(objects, monotonic() - start):
+                            return
+                backoff = WATCH_BACKOFF_INITIAL
+                if await done(objects, monotonic() - start):
+                    return
+            except client.ApiException as exc:
+                if exc.status == 410:
+                    logger.info("watch_expired: relisting")
+                    resource_version = None
+                    continue
+                if exc.status is not None and exc.status < 500 and exc.status != 429:
+                    raise
+                logger.warning(f"watch_dropped: {exc}; polling again in {backoff}s")
+                resource_version = None
+                await asyncio.sleep(min(backoff, max(0.0, deadline - monotonic())))
+                backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+            except (ClientError, asyncio.TimeoutError, OSError) as exc:
+                logger.warning(f"watch_dropped: {exc}; polling again in {backoff}s")
+                resource_version = None
+                await asyncio.sleep(min(backoff, max(0.0, deadline - monotonic())))
+                backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+
+    async def wait_for_namespace_deletion(self, namespace: str, timeout: float = 600):
+        async def done(objects: dict[str, Any], _elapsed: float) -> bool:
+            return namespace not in objects
+
+        try:
+            await self._watch_until(
+                self.core.list_namespace,
+                done,
+                timeout,
+                field_selector=f"metadata.name={namespace}",
+            )
+        except TimeoutError:
+            raise TimeoutError(f"Namespace {namespace} deletion timed out") from None
+
+    async def wait_for_job_completion(
+        self,
+        namespace: str,
+        job_name: str,
+        timeout: float = 900,
+        backoff_limit: int = 5,
+        already_waited: float = 0,
+        ready_fallback: bool = True,
+    ):
+        logger.info(f"wait_job_start: namespace={namespace}, job={job_name}")
+        state = {"seen": False}
+
+        async def done(objects: dict[str, Any], watched: float) -> bool:
+            elapsed = already_waited + watched
+            job = objects.get(job_name)
+            if job is None:
+                if state["seen"]:
+                    logger.info(f"wait_job_deleted: job={job_name} was deleted after completion")
+                    return True
+                # Same fallback as K8sClient: a job that never shows up after 180s
+                # may have completed and been cleaned up already.
+                return ready_fallback and elapsed > 180 and await self._is_wordpress_ready(namespace)
+
+            state["seen"] = True
+            status = job.status
+            if status and status.succeeded and status.succeeded >= 1:
+                logger.info(f"wait_job_complete: job={job_name}, total_wait={elapsed:.0f}s")
+                return True
+            if status and status.failed and status.failed >= backoff_limit:
+                logger.error(f"wait_job_failed: job={job_name}, failed_count={status.failed}")
+                raise RuntimeError(f"Job {job_name} failed")
+            return False
+
+        try:
+            await self._watch_until(
+                self.batch.list_namespaced_job,
+                done,
+                timeout,
+                namespace,
+                field_selector=f"metadata.name={job_name}",
+            )
+        except TimeoutError:
+            logger.error(f"wait_job_timeout: job={job_name}, timeout={timeout}s")
+            raise TimeoutError(f"Job {job_name} timed out") from None
+
+    async def wait_for_pods_ready(self, namespace: str, apps: List[str], timeout: float = 600):
+        """Wait until every app has at least one pod and all of its pods are ready."""
+        logger.info(f"wait_pods_start: namespace={namespace}, apps={apps}")
+
+        async def done(objects: dict[str, Any], _elapsed: float) -> bool:
+            by_app: dict[str, list[bool]] = {app: [] for app in apps}
+            for pod in objects.values():
+                app = (pod.metadata.labels or {}).get("app")
+                if app in by_app:
+                    by_app[app].append(K8sClient._pod_ready(pod))
+            return all(states and all(states) for states in by_app.values())
+
+        try:
+            await self._watch_until(
+                self.core.list_namespaced_pod,
+                done,
+                timeout,
+                namespace,
+                label_selector=f"app in ({','.join(apps)})",
+            )
+        except TimeoutError:
+            raise TimeoutError("Pods not ready") from None
+        logger.info(f"wait_pods_ready: namespace={namespace}")
+
+    async def _is_wordpress_ready(self, namespace: str) -> bool:
+        try:
+            pods = await self.core.list_namespaced_pod(namespace, label_selector="app=wordpress")
+        except Exception as e:
+            logger.warning(f"wordpress_ready_check_failed: {e}")
+            return False
+        return any(pod.status.phase == "Running" and K8sClient._pod_ready(pod) for pod in pods.items)
@@ -1,34 +1,204 @@
 import logging
-from time import sleep
-from typing import List, cast
+import os
+import random
+import threading
+from time import monotonic, sleep
+from typing import Any, Callable, List, cast
 
-from kubernetes import client, config
+from kubernetes import client, config, dynamic, watch
+from kubernetes.utils import parse_quantity
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from app.core.config import settings
+from app.core.metrics import K8S_API_RETRIES, K8S_CLIENT_THROTTLE, instrument_api_client
+from app.core.tracing import trace_api_client
 
 logger = logging.getLogger("k8s_client")
 
+# Server-side watch windows are kept short so time-based conditions (like the
+# "job never appeared" fallback) are re-evaluated even when no events arrive.
+WATCH_WINDOW_SECONDS = 60
+WATCH_BACKOFF_INITIAL = 1.0
+WATCH_BACKOFF_MAX = 15.0
+
+FIELD_MANAGER = "urumi-provisioner"
+
+# Statuses after which a request is retried. The API server has not acted on a
+# 429 or 503, so those are retried for every verb; the rest are not retried for
+# POST, whose create may already have happened.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+_RETRY_STATUSES_POST = {429, 503}
+RETRY_BACKOFF_INITIAL = 0.5
+RETRY_BACKOFF_MAX = 10.0
+
+
+def _millicores(quantity: str | None) -> int:
+    return int(parse_quantity(quantity) * 1000) if quantity else 0
+
+
+def _bytes(quantity: str | None) -> int:
+    return int(parse_quantity(quantity)) if quantity else 0
+
+
+def pod_ready(pod: Any) -> bool:
+    if not pod.status or not pod.status.container_statuses:
+        return False
+    return all(cs.ready for cs in pod.status.container_statuses)
+
+
+def pod_snapshot(pod: Any) -> dict:
+    """The fields of a pod that health and readiness checks look at."""
+    return {
+        "app": (pod.metadata.labels or {}).get("app"),
+        "phase": pod.status.phase if pod.status else None,
+        "ready": pod_ready(pod),
+    }
+
+
+def job_snapshot(job: Any) -> dict:
+    status = job.status
+    return {"succeeded": (status.succeeded if status else None) or 0, "failed": (status.failed if status else None) or 0}
+
+
+def _selected_app(label_selector: str) -> str | None:
+    key, _, value = label_selector.partition("=")
+    return value if key == "app" and value and "," not in value else None
+
+
+class RateLimiter:
+    """Token bucket allowing `qps` requests per second on average and bursts of `burst`.
+
+    Callers over the limit reserve a future slot and sleep until it comes up,
+    so waiting threads are served in arrival order. A qps of 0 disables it.
+    """
+
+    def __init__(self, qps: float, burst: int):
+        self.qps = qps
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.qps <= 0:
+            return
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.qps) - 1
+            self._updated = now
+            wait = -self._tokens / self.qps if self._tokens < 0 else 0.0
+        K8S_CLIENT_THROTTLE.observe(wait)
+        if wait:
+            sleep(wait)
+
+
+def _retry_delay(exc: client.ApiException, attempt: int) -> float:
+    retry_after = (exc.headers or {}).get("Retry-After") if exc.status == 429 else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), RETRY_BACKOFF_MAX)
+    backoff = min(RETRY_BACKOFF_INITIAL * 2**attempt, RETRY_BACKOFF_MAX)
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def throttle_api_client(api_client, limiter: RateLimiter, max_retries: int):
+    """Rate limit every request through a kubernetes ApiClient and retry 429/5xx with backoff."""
+    call_api = api_client.call_api
+
+    def throttled_call_api(resource_path, method, *args, **kwargs):
+        retry_statuses = _RETRY_STATUSES_POST if method == "POST" else RETRY_STATUSES
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                return call_api(resource_path, method, *args, **kwargs)
+            except client.ApiException as exc:
+                if exc.status not in retry_statuses or attempt >= max_retries:
+                    raise
+                delay = _retry_delay(exc, attempt)
+                attempt += 1
+                K8S_API_RETRIES.labels(str(exc.status)).inc()
+                logger.warning(f"k8s.retry: {method} {resource_path} status={exc.status} attempt={attempt} delay={delay:.2f}s")
+                sleep(delay)
+
+    api_client.call_api = throttled_call_api
+    return api_client
+
 
 class K8sClient:
-    def __init__(self, kubeconfig_path: str | None = None):
+    # Set on the shared client by get_k8s_client when APP_K8S_INFORMER_ENABLED.
+    informer: Any = None
+
+    def __init__(self, kubeconfig_path: str | None = None, limiter: RateLimiter | None = None):
+        configuration = client.Configuration()
         if kubeconfig_path:
-            config.load_kube_config(config_file=kubeconfig_path)
+            config.load_kube_config(config_file=kubeconfig_path, client_configuration=configuration)
         else:
             try:
-                config.load_kube_config()
+                config.load_kube_config(client_configuration=configuration)
             except config.ConfigException:
-                config.load_incluster_config()
-        self.core = client.CoreV1Api()
-        self.batch = client.BatchV1Api()
+                config.load_incluster_config(client_configuration=configuration)
+        configuration.connection_pool_maxsize = settings.k8s_connection_pool_size
+        api_client = throttle_api_client(
+            client.ApiClient(configuration),
+            limiter or RateLimiter(settings.k8s_client_qps, settings.k8s_client_burst),
+            settings.k8s_client_max_retries,
+        )
+        self.api_client = instrument_api_client(trace_api_client(api_client))
+        self.core = client.CoreV1Api(self.api_client)
+        self.batch = client.BatchV1Api(self.api_client)
+        self._dynamic: dynamic.DynamicClient | None = None
+
+    @property
+    def dynamic(self) -> dynamic.DynamicClient:
+        if self._dynamic is None:
+            self._dynamic = dynamic.DynamicClient(self.api_client)
+        return self._dynamic
+
+    def apply_manifests(self, manifests: List[dict], field_manager: str = FIELD_MANAGER):
+        """Server-side apply each manifest, in the order given."""
+        for manifest in manifests:
+            resource = self.dynamic.resources.get(api_version=manifest["apiVersion"], kind=manifest["kind"])
+            metadata = manifest.get("metadata", {})
+            logger.info(f"apply_manifest: kind={manifest['kind']}, name={metadata.get('name')}")
+            self.dynamic.server_side_apply(
+                resource,
+                body=manifest,
+                namespace=metadata.get("namespace"),
+                field_manager=field_manager,
+                force_conflicts=True,
+            )
+
+    def _cached(self, kind: str, namespace: str) -> dict[str, dict] | None:
+        return self.informer.objects(kind, namespace) if self.informer is not None else None
 
     def get_pod_status(self, namespace: str, label_selector: str) -> List[dict]:
+        app = _selected_app(label_selector)
+        cached = self._cached("pods", namespace) if app else None
+        if cached is not None:
+            return [{"name": name, "ready": pod["ready"]} for name, pod in cached.items() if pod["app"] == app]
         pods = self.core.list_namespaced_pod(namespace, label_selector=label_selector)
         results = []
         for pod in pods.items:
-            ready = False
-            if pod.status.container_statuses:
-                ready = all(cs.ready for cs in pod.status.container_statuses)
-            results.append({"name": pod.metadata.name, "ready": ready})
+            results.append({"name": pod.metadata.name, "ready": self._pod_ready(pod)})
         return results
 
+    def get_pod_statuses(self, namespaces: set[str], apps: List[str]) -> dict[str, dict[str, List[bool]]]:
+        """Readiness of each app's pods per namespace, from one cross-namespace pod list."""
+        statuses: dict[str, dict[str, List[bool]]] = {namespace: {} for namespace in namespaces}
+        if self.informer is not None and self.informer.synced("pods"):
+            for namespace in namespaces:
+                for pod in (self.informer.objects("pods", namespace) or {}).values():
+                    if pod["app"] in apps:
+                        statuses[namespace].setdefault(pod["app"], []).append(pod["ready"])
+            return statuses
+        pods = self.core.list_pod_for_all_namespaces(label_selector=f"app in ({','.join(apps)})")
+        for pod in pods.items:
+            by_app = statuses.get(pod.metadata.namespace)
+            app = (pod.metadata.labels or {}).get("app")
+            if by_app is not None and app in apps:
+                by_app.setdefault(app, []).append(self._pod_ready(pod))
+        return statuses
+
     def namespace_exists(self, namespace: str) -> bool:
         try:
             self.core.read_namespace(namespace)
@@ -44,69 +214,301 @@ class K8sClient:
         body = client.V1Namespace(metadata=client.V1ObjectMeta(name=namespace))
         self.core.create_namespace(body)
 
-    def delete_namespace(self, namespace: str):
+    def delete_namespace(self, namespace: str, propagation_policy: str | None = None):
         try:
-            self.core.delete_namespace(namespace)
+            self.core.delete_namespace(namespace, propagation_policy=propagation_policy)
         except client.ApiException as exc:
             if exc.status == 404:
                 return
             raise
 
-    def wait_for_namespace_deletion(self, namespace: str, timeout: int = 600):
-        waited = 0
-        while waited < timeout:
-            if not self.namespace_exists(namespace):
+    def cluster_capacity(self) -> tuple[dict[str, int], dict[str, int]]:
+        """Return (allocatable, requested) cpu millicores and memory bytes.
+
+        Only Ready, schedulable nodes count towards allocatable; requested sums the
+        container requests of every pod that has not finished.
+        """
+        allocatable = {"cpu": 0, "memory": 0}
+        for node in self.core.list_node().items:
+            if node.spec and node.spec.unschedulable:
+                continue
+            conditions = (node.status.conditions or []) if node.status else []
+            if not any(c.type == "Ready" and c.status == "True" for c in conditions):
+                continue
+            resources = node.status.allocatable or {}
+            allocatable["cpu"] += _millicores(resources.get("cpu"))
+            allocatable["memory"] += _bytes(resources.get("memory"))
+
+        requested = {"cpu": 0, "memory": 0}
+        pods = self.core.list_pod_for_all_namespaces(
+            field_selector="status.phase!=Succeeded,status.phase!=Failed",
+        )
+        for pod in pods.items:
+            for container in pod.spec.containers or []:
+                requests = (container.resources.requests if container.resources else None) or {}
+                requested["cpu"] += _millicores(requests.get("cpu"))
+                requested["memory"] += _bytes(requests.get("memory"))
+        return allocatable, requested
+
+    def job_failed(self, namespace: str, job_name: str, backoff_limit: int = 5) -> bool:
+        cached = self._cached("jobs", namespace)
+        if cached is not None:
+            job = cached.get(job_name)
+            return bool(job and job["failed"] >= backoff_limit)
+        try:
+            job = cast(client.V1Job, self.batch.read_namespaced_job(job_name, namespace))
+        except client.ApiException as exc:
+            if exc.status == 404:
+                return False
+            raise
+        return bool(job.status and job.status.failed and job.status.failed >= backoff_limit)
+
+    def delete_job(self, namespace: str, job_name: str):
+        try:
+            self.batch.delete_namespaced_job(job_name, namespace, propagation_policy="Background")
+        except client.ApiException as exc:
+            if exc.status == 404:
                 return
-            sleep(5)
-            waited += 5
-        raise TimeoutError(f"Namespace {namespace} deletion timed out")
+            raise
 
-    def wait_for_job_completion(self, namespace: str, job_name: str, timeout: int = 900, backoff_limit: int = 5):
-        logger.info(f"wait_job_start: namespace={namespace}, job={job_name}")
-        waited = 0
-        seen_job = False
-        last_status = None
-        while waited < timeout:
+    def _watch_until(
+        self,
+        list_func: Callable[..., Any],
+        done: Callable[[dict[str, Any], float], bool],
+        timeout: int,
+        *args: Any,
+        convert: Callable[[Any], Any] = lambda obj: obj,
+        state: dict | None = None,
+        **list_kwargs: Any,
+    ) -> None:
+        """Watch objects returned by list_func until done(objects, elapsed) is true.
+
+        objects maps names to convert(object).
+
+        state, when given, is kept up to date with the last resourceVersion and
+        objects; passing it to a later call resumes the watch from there
+        without listing again. convert must then return JSON-serializable values
+        so callers can checkpoint it.
+
+        The initial list establishes the current state and a resourceVersion;
+        events are then streamed from that version and the watch is resumed
+        from the last seen version whenever a stream window ends. If the watch
+        drops or the version expires (410 Gone), the state is re-listed with
+        exponential backoff before watching again.
+        """
+        start = monotonic()
+        deadline = start + timeout
+        backoff = WATCH_BACKOFF_INITIAL
+        resource_version: str | None = None
+        objects: dict[str, Any] = {}
+        if state is None:
+            state = {}
+        elif state.get("resource_version"):
+            resource_version = state["resource_version"]
+            objects = dict(state["objects"])
+
+        def remember():
+            state.update(resource_version=resource_version, objects=objects)
+
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise TimeoutError("watch timed out")
             try:
-                job = cast(client.V1Job, self.batch.read_namespaced_job(job_name, namespace))
-                if not seen_job:
-                    logger.info(f"wait_job_found: job={job_name}")
-                seen_job = True
-                status = job.status
-                # Log status changes
-                current_status = f"succeeded={getattr(status, 'succeeded', 0)}, failed={getattr(status, 'failed', 0)}"
-                if current_status != last_status:
-                    logger.info(f"wait_job_status: {current_status}, waited={waited}s")
-                    last_status = current_status
-                if status and status.succeeded and status.succeeded >= 1:
-                    logger.info(f"wait_job_complete: job={job_name}, total_wait={waited}s")
+                if resource_version is None:
+                    listing = list_func(*args, **list_kwargs)
+                    objects = {item.metadata.name: convert(item) for item in listing.items}
+                    resource_version = listing.metadata.resource_version
+                    remember()
+                    if done(objects, monotonic() - start):
+                        return
+
+                window = max(1, min(int(remaining), WATCH_WINDOW_SECONDS))
+                stream = watch.Watch().stream(
+                    list_func,
+                    *args,
+                    resource_version=resource_version,
+                    timeout_seconds=window,
+                    _request_timeout=window + 5,
+                    **list_kwargs,
+                )
+                for event in stream:
+                    obj = event["object"]
+                    resource_version = obj.metadata.resource_version
+                    if event["type"] == "DELETED":
+                        objects.pop(obj.metadata.name, None)
+                    else:
+                        objects[obj.metadata.name] = convert(obj)
+                    remember()
+                    if done(objects, monotonic() - start):
+                        return
+                backoff = WATCH_BACKOFF_INITIAL
+                # The stream window ended without a decision; re-evaluate so
+                # time-based conditions are checked even when nothing changes.
+                if done(objects, monotonic() - start):
                     return
-                if status and status.failed and status.failed >= backoff_limit:
-                    logger.error(f"wait_job_failed: job={job_name}, failed_count={status.failed}")
-                    raise RuntimeError(f"Job {job_name} failed")
             except client.ApiException as exc:
-                if exc.status == 404:
-                    if seen_job:
-                        logger.info(f"wait_job_deleted: job={job_name} was deleted after completion")
-                        return
-                    # Job not found - could be not created yet OR already completed and deleted
-                    # If we've waited more than 180s, check if WordPress is ready as alternative signal
-                    if waited > 180:
-                        if self._is_wordpress_ready(namespace):
-                            logger.info(f"wait_job_assumed_complete: job={job_name} not found but WordPress is ready, waited={waited}s")
-                            return
-                    if waited % 30 == 0:  # Log every 30 seconds while waiting for job to appear
-                        logger.info(f"wait_job_not_found: job={job_name} not yet created, waited={waited}s")
-                else:
-                    logger.error(f"wait_job_api_error: {exc}")
+                if exc.status == 410:
+                    logger.info("watch_expired: relisting")
+                    resource_version = None
+                    remember()
+                    continue
+                if exc.status is not None and exc.status < 500 and exc.status != 429:
                     raise
-            sleep(10)
-            waited += 10
-        logger.error(f"wait_job_timeout: job={job_name}, timeout={timeout}s")
-        raise TimeoutError(f"Job {job_name} timed out")
+                logger.warning(f"watch_dropped: {exc}; polling again in {backoff}s")
+                resource_version = None
+                remember()
+                sleep(min(backoff, max(0.0, deadline - monotonic())))
+                backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+            except (ProtocolError, ReadTimeoutError, OSError) as exc:
+                logger.warning(f"watch_dropped: {exc}; polling again in {backoff}s")
+                resource_version = None
+                remember()
+                sleep(min(backoff, max(0.0, deadline - monotonic())))
+                backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+
+    def _wait_for(
+        self,
+        kind: str,
+        namespace: str,
+        done: Callable[[dict[str, Any], float], bool],
+        timeout: int,
+        list_func: Callable[..., Any],
+        convert: Callable[[Any], dict],
+        watch_state: dict | None = None,
+        **list_kwargs: Any,
+    ) -> None:
+        """_watch_until over snapshots, served from the informer while it is synced.
+
+        watch_state is only used (and updated) when the API server is watched directly.
+        """
+        if self.informer is not None and self.informer.synced(kind):
+            started = monotonic()
+            result = self.informer.wait(kind, namespace, done, timeout)
+            if result is not None:
+                if not result:
+                    raise TimeoutError("watch timed out")
+                return
+            # The cache went stale mid-wait; finish on a live watch, keeping elapsed continuous.
+            offset = monotonic() - started
+            timeout = max(0, timeout - offset)
+            cached_done = done
+
+            def done(objects: dict[str, Any], elapsed: float) -> bool:
+                return cached_done(objects, offset + elapsed)
+
+        self._watch_until(list_func, done, timeout, namespace, convert=convert, state=watch_state, **list_kwargs)
+
+    def wait_for_namespace_deletion(self, namespace: str, timeout: int = 600):
+        try:
+            self._watch_until(
+                self.core.list_namespace,
+                lambda objects, _elapsed: namespace not in objects,
+                timeout,
+                field_selector=f"metadata.name={namespace}",
+            )
+        except TimeoutError:
+            raise TimeoutError(f"Namespace {namespace} deletion timed out") from None
+
+    def wait_for_job_completion(
+        self,
+        namespace: str,
+        job_name: str,
+        timeout: int = 900,
+        backoff_limit: int = 5,
+        already_waited: float = 0,
+        ready_fallback: bool = True,
+        watch_state: dict | None = None,
+    ):
+        logger.info(f"wait_job_start: namespace={namespace}, job={job_name}")
+        # A resumed watch may already hold the job; its deletion then means completion.
+        seen = job_name in ((watch_state or {}).get("objects") or {})
+        state = {"seen": seen, "last_status": None, "last_not_found_log": -30.0}
+
+        def done(objects: dict[str, Any], watched: float) -> bool:
+            elapsed = already_waited + watched
+            job = objects.get(job_name)
+            if job is None:
+                if state["seen"]:
+                    logger.info(f"wait_job_deleted: job={job_name} was deleted after completion")
+                    return True
+                # Job not found - could be not created yet OR already completed and deleted
+                # If we've waited more than 180s, check if WordPress is ready as alternative signal
+                # (not for jobs that run against an already-ready store, e.g. the rebind job)
+                if ready_fallback and elapsed > 180 and self._is_wordpress_ready(namespace):
+                    logger.info(f"wait_job_assumed_complete: job={job_name} not found but WordPress is ready, waited={elapsed:.0f}s")
+                    return True
+                if elapsed - state["last_not_found_log"] >= 30:
+                    logger.info(f"wait_job_not_found: job={job_name} not yet created, waited={elapsed:.0f}s")
+                    state["last_not_found_log"] = elapsed
+                return False
+
+            if not state["seen"]:
+                logger.info(f"wait_job_found: job={job_name}")
+            state["seen"] = True
+            # Log status changes
+            current_status = f"succeeded={job['succeeded']}, failed={job['failed']}"
+            if current_status != state["last_status"]:
+                logger.info(f"wait_job_status: {current_status}, waited={elapsed:.0f}s")
+                state["last_status"] = current_status
+            if job["succeeded"] >= 1:
+                logger.info(f"wait_job_complete: job={job_name}, total_wait={elapsed:.0f}s")
+                return True
+            if job["failed"] >= backoff_limit:
+                logger.error(f"wait_job_failed: job={job_name}, failed_count={job['failed']}")
+                raise RuntimeError(f"Job {job_name} failed")
+            return False
+
+        try:
+            self._wait_for(
+                "jobs",
+                namespace,
+                done,
+                timeout,
+                self.batch.list_namespaced_job,
+                job_snapshot,
+                watch_state=watch_state,
+                field_selector=f"metadata.name={job_name}",
+            )
+        except TimeoutError:
+            logger.error(f"wait_job_timeout: job={job_name}, timeout={timeout}s")
+            raise TimeoutError(f"Job {job_name} timed out") from None
+
+    def wait_for_pods_ready(self, namespace: str, apps: List[str], timeout: int = 600, watch_state: dict | None = None):
+        """Wait until every app has at least one pod and all of its pods are ready."""
+        logger.info(f"wait_pods_start: namespace={namespace}, apps={apps}")
+
+        def done(objects: dict[str, Any], _elapsed: float) -> bool:
+            by_app: dict[str, list[bool]] = {app: [] for app in apps}
+            for pod in objects.values():
+                if pod["app"] in by_app:
+                    by_app[pod["app"]].append(pod["ready"])
+            return all(states and all(states) for states in by_app.values())
+
+        try:
+            self._wait_for(
+                "pods",
+                namespace,
+                done,
+                timeout,
+                self.core.list_namespaced_pod,
+                pod_snapshot,
+                watch_state=watch_state,
+                label_selector=f"app in ({','.join(apps)})",
+            )
+        except TimeoutError:
+            raise TimeoutError("Pods not ready") from None
+        logger.info(f"wait_pods_ready: namespace={namespace}")
+
+    @staticmethod
+    def _pod_ready(pod: Any) -> bool:
+        return pod_ready(pod)
 
     def _is_wordpress_ready(self, namespace: str) -> bool:
         """Check if WordPress pod is ready as alternative completion signal."""
+        cached = self._cached("pods", namespace)
+        if cached is not None:
+            return any(pod["app"] == "wordpress" and pod["phase"] == "Running" and pod["ready"] for pod in cached.values())
         try:
             pods = self.core.list_namespaced_pod(namespace, label_selector="app=wordpress")
             for pod in pods.items:
@@ -120,3 +522,32 @@ class K8sClient:
         except Exception as e:
             logger.warning(f"wordpress_ready_check_failed: {e}")
             return False
+
+
+_shared_client: K8sClient | None = None
+# Pid the shared client was built in; a forked worker builds its own so it
+# never reuses the parent's pooled connections.
+_shared_client_pid: int | None = None
+_shared_client_lock = threading.Lock()
+
+
+def get_k8s_client() -> K8sClient:
+    """The process-wide K8sClient for the configured cluster backend.
+
+    Kubeconfig is loaded once, and every caller shares one connection pool and
+    one client-side rate limiter.
+    """
+    global _shared_client, _shared_client_pid
+    if settings.cluster_backend == "fake":
+        from app.services.fake_cluster import FakeK8sClient
+
+        return FakeK8sClient()
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client_pid != os.getpid():
+            _shared_client = K8sClient(settings.kubeconfig_path)
+            _shared_client_pid = os.getpid()
+            if settings.k8s_informer_enabled:
+                from app.services.store_informer import StoreInformer
+
+                _shared_client.informer = StoreInformer(_shared_client).start()
+        return _shared_client
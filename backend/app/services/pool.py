@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import secrets
+import time
+import uuid
+from datetime import datetime, timezone
+
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import hash_password
+from app.models.provisioning import StoreProvisioningORM
+from app.models.store import StoreORM
+from app.models.user import UserORM
+from app.schemas.pool import ClaimLatency, WarmPoolStats
+from app.schemas.store import ProvisioningPhase, StoreStatus
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger("warm_pool")
+
+HITS_KEY = "warm_pool:hits"
+MISSES_KEY = "warm_pool:misses"
+LATENCY_KEY = "warm_pool:claim_latency_ms"
+LATENCY_SAMPLES = 1000
+
+
+def get_pool_owner(db: Session, create: bool = False) -> UserORM | None:
+    """Return the system user that owns unassigned warm pool stores."""
+    owner = db.query(UserORM).filter(UserORM.email == settings.warm_pool_owner_email).first()
+    if owner or not create:
+        return owner
+    owner = UserORM(
+        email=settings.warm_pool_owner_email,
+        hashed_password=hash_password(secrets.token_urlsafe(32)),
+        store_quota=0,
+    )
+    db.add(owner)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another process created it first.
+        db.rollback()
+        return db.query(UserORM).filter(UserORM.email == settings.warm_pool_owner_email).first()
+    db.refresh(owner)
+    return owner
+
+
+def pool_counts(db: Session, owner_id) -> dict[str, int]:
+    rows = (
+        db.query(StoreORM.status, func.count(StoreORM.id))
+        .filter(StoreORM.user_id == owner_id)
+        .group_by(StoreORM.status)
+        .all()
+    )
+    return {status: count for status, count in rows}
+
+
+def create_pooled_store(db: Session, owner_id) -> StoreORM:
+    store_id = uuid.uuid4()
+    name = f"pool-{store_id.hex[:12]}"
+    store = StoreORM(
+        id=store_id,
+        user_id=owner_id,
+        name=name,
+        domain=f"{name}.{settings.public_ip}.{settings.base_domain}",
+        namespace=f"store-{store_id}",
+        status=StoreStatus.PENDING.value,
+        helm_release_name=f"store-{store_id}",
+    )
+    db.add(store)
+    db.commit()
+    return store
+
+
+async def claim_pooled_store(db: AsyncSession, user_id, name: str, domain: str) -> StoreORM | None:
+    """Hand a ready pooled store to a user, or return None if the pool is empty.
+
+    The store keeps its id, namespace and helm release; provisioning resumes at the
+    rebind phase, which moves it to the new domain and rotates admin credentials.
+    """
+    if settings.warm_pool_size <= 0:
+        return None
+    started = time.perf_counter()
+    owner_id = await db.scalar(select(UserORM.id).where(UserORM.email == settings.warm_pool_owner_email))
+    store = None
+    if owner_id:
+        store = await db.scalar(
+            select(StoreORM)
+            .where(StoreORM.user_id == owner_id, StoreORM.status == StoreStatus.READY.value)
+            .order_by(StoreORM.ready_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+    progress = await db.get(StoreProvisioningORM, store.id) if store else None
+    if not store or not progress:
+        await db.rollback()
+        await asyncio.to_thread(_record_claim, hit=False)
+        return None
+
+    progress.previous_domain = store.domain
+    progress.phase = ProvisioningPhase.REBIND.value
+    progress.phase_started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    progress.failures = 0
+    progress.last_error = None
+
+    store.user_id = user_id
+    store.name = name
+    store.domain = domain
+    store.status = StoreStatus.PENDING.value
+    store.admin_password = None
+    store.error_message = None
+    store.ready_at = None
+    store.created_at = func.now()
+    await db.commit()
+    await db.refresh(store)
+
+    await asyncio.to_thread(_record_claim, hit=True, latency_ms=(time.perf_counter() - started) * 1000)
+    logger.info("warm_pool.claimed", extra={"store_id": str(store.id)})
+    return store
+
+
+def _record_claim(hit: bool, latency_ms: float | None = None):
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(HITS_KEY if hit else MISSES_KEY)
+        if latency_ms is not None:
+            pipe.lpush(LATENCY_KEY, f"{latency_ms:.3f}")
+            pipe.ltrim(LATENCY_KEY, 0, LATENCY_SAMPLES - 1)
+        pipe.execute()
+    except RedisError as exc:
+        logger.warning(f"warm_pool.metrics_failed: {exc}")
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def get_pool_stats(db: Session) -> WarmPoolStats:
+    owner = get_pool_owner(db)
+    counts = pool_counts(db, owner.id) if owner else {}
+
+    try:
+        redis_client = get_redis()
+        hits = int(redis_client.get(HITS_KEY) or 0)
+        misses = int(redis_client.get(MISSES_KEY) or 0)
+        samples = sorted(float(v) for v in redis_client.lrange(LATENCY_KEY, 0, -1))
+    except RedisError as exc:
+        # Claim metrics are best-effort; the pool counts still come from the database.
+        logger.warning(f"warm_pool.metrics_unavailable: {exc}")
+        hits, misses, samples = 0, 0, []
+
+    latency = ClaimLatency(samples=len(samples))
+    if samples:
+        latency.avg_ms = sum(samples) / len(samples)
+        latency.p50_ms = _percentile(samples, 0.50)
+        latency.p95_ms = _percentile(samples, 0.95)
+        latency.max_ms = samples[-1]
+
+    total = hits + misses
+    return WarmPoolStats(
+        target_size=settings.warm_pool_size,
+        ready=counts.get(StoreStatus.READY.value, 0),
+        provisioning=counts.get(StoreStatus.PENDING.value, 0),
+        hits=hits,
+        misses=misses,
+        hit_rate=hits / total if total else None,
+        claim_latency=latency,
+    )
@@ -0,0 +1,72 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.metrics import PRINCIPAL_CACHE_LOOKUPS
+from app.models.user import UserORM
+
+
+class Principal:
+    """The authenticated user as routes see it: a detached snapshot of the user row."""
+
+    def __init__(self, id: uuid.UUID, email: str, store_quota: int):
+        self.id = id
+        self.email = email
+        self.store_quota = store_quota
+
+    @classmethod
+    def from_user(cls, user: UserORM) -> "Principal":
+        return cls(id=user.id, email=user.email, store_quota=user.store_quota)
+
+
+class PrincipalCache:
+    """Bounded LRU of principals by user id, each entry valid for ttl_seconds.
+
+    Entries are per process; invalidate() only reaches this process, so the
+    TTL bounds how long other API replicas can serve a stale quota.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[uuid.UUID, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: uuid.UUID) -> Principal | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                PRINCIPAL_CACHE_LOOKUPS.labels("miss").inc()
+                return None
+            self._entries.move_to_end(user_id)
+        PRINCIPAL_CACHE_LOOKUPS.labels("hit").inc()
+        return entry[1]
+
+    def put(self, principal: Principal):
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: uuid.UUID):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+def invalidate_principal(user_id):
+    """Drop a user's cached principal; call after changing their row."""
+    principal_cache.invalidate(user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id)))
@@ -1,12 +1,20 @@
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.store import StoreORM
+from app.models.user import UserORM
+from app.services.principals import invalidate_principal
 
 
-def get_store_count(db: Session, user_id) -> int:
-    return db.query(func.count(StoreORM.id)).filter(StoreORM.user_id == user_id).scalar() or 0
+async def get_store_count(db: AsyncSession, user_id) -> int:
+    return await db.scalar(select(func.count(StoreORM.id)).where(StoreORM.user_id == user_id)) or 0
 
 
-def check_quota(db: Session, user_id, quota_limit: int) -> bool:
-    return get_store_count(db, user_id) < quota_limit
+async def check_quota(db: AsyncSession, user_id, quota_limit: int) -> bool:
+    return await get_store_count(db, user_id) < quota_limit
+
+
+async def set_store_quota(db: AsyncSession, user_id, quota_limit: int):
+    await db.execute(update(UserORM).where(UserORM.id == user_id).values(store_quota=quota_limit))
+    await db.commit()
+    invalidate_principal(user_id)
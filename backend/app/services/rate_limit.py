@@ -1,8 +1,39 @@
+import logging
+import math
+import time
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.rate_limit import RateLimitORM
+from app.services.redis_client import get_async_redis
+
+logger = logging.getLogger("rate_limit")
+
+KEY_PREFIX = "rate_limit"
+
+# Token bucket holding up to ARGV[1] tokens, refilled at ARGV[2] tokens per
+# second; a request takes one token. Returns {allowed, tokens left}.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(tokens)}
+"""
 
 
 def _window_start(now: datetime, window_seconds: int) -> datetime:
@@ -11,41 +42,71 @@ def _window_start(now: datetime, window_seconds: int) -> datetime:
     return datetime.fromtimestamp(window_epoch, tz=timezone.utc)
 
 
-def check_rate_limit(
-    db: Session,
+async def check_rate_limit(
+    db: AsyncSession,
     user_id,
     endpoint: str,
     limit: int,
     window_seconds: int,
 ) -> tuple[bool, int]:
+    """Take one request from the user's allowance for an endpoint.
+
+    Returns (allowed, seconds): the window length when allowed, otherwise how
+    long to wait. Uses the Redis token bucket unless APP_RATE_LIMIT_BACKEND is
+    "sql" or Redis is unreachable.
+    """
+    if settings.rate_limit_backend == "redis":
+        try:
+            return await _check_redis(user_id, endpoint, limit, window_seconds)
+        except RedisError as exc:
+            logger.warning(f"rate_limit.redis_unavailable: {exc}")
+    return await _check_sql(db, user_id, endpoint, limit, window_seconds)
+
+
+async def _check_redis(user_id, endpoint: str, limit: int, window_seconds: int) -> tuple[bool, int]:
+    # `limit` tokens refill evenly over the window, so the allowance slides
+    # with time instead of resetting at window boundaries.
+    rate = limit / window_seconds
+    allowed, tokens = await get_async_redis().eval(
+        _TOKEN_BUCKET_SCRIPT,
+        1,
+        f"{KEY_PREFIX}:{user_id}:{endpoint}",
+        limit,
+        repr(rate),
+        repr(time.time()),
+        window_seconds,
+    )
+    if allowed:
+        return True, window_seconds
+    return False, max(math.ceil((1 - float(tokens)) / rate), 1)
+
+
+async def _check_sql(
+    db: AsyncSession,
+    user_id,
+    endpoint: str,
+    limit: int,
+    window_seconds: int,
+) -> tuple[bool, int]:
+    """Fixed-window counter in the rate_limits table."""
     now = datetime.now(timezone.utc)
     window_start = _window_start(now, window_seconds)
 
-    record = (
-        db.query(RateLimitORM)
-        .filter(
-            RateLimitORM.user_id == user_id,
-            RateLimitORM.endpoint == endpoint,
-            RateLimitORM.window_start == window_start,
+    # One upsert per request, so concurrent first requests of a window do not
+    # collide on the unique constraint.
+    statement = (
+        insert(RateLimitORM)
+        .values(user_id=user_id, endpoint=endpoint, window_start=window_start, request_count=1)
+        .on_conflict_do_update(
+            index_elements=[RateLimitORM.user_id, RateLimitORM.endpoint, RateLimitORM.window_start],
+            set_={"request_count": RateLimitORM.request_count + 1},
         )
-        .first()
+        .returning(RateLimitORM.request_count)
     )
+    request_count = await db.scalar(statement)
+    await db.commit()
 
-    if not record:
-        record = RateLimitORM(
-            user_id=user_id,
-            endpoint=endpoint,
-            window_start=window_start,
-            request_count=1,
-        )
-        db.add(record)
-        db.commit()
-        return True, window_seconds
-
-    if record.request_count >= limit:
+    if request_count > limit:
         retry_after = int((window_start + timedelta(seconds=window_seconds) - now).total_seconds())
         return False, max(retry_after, 1)
-
-    record.request_count += 1
-    db.commit()
     return True, window_seconds
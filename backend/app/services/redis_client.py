@@ -0,0 +1,36 @@
+import asyncio
+import weakref
+
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+
+
+_client: redis.Redis | None = None
+
+
+def get_redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    return _client
+
+
+# redis.asyncio connections belong to the event loop that opened them.
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Client for the running event loop; call from inside a coroutine."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=settings.redis_request_timeout_seconds,
+            socket_timeout=settings.redis_request_timeout_seconds,
+        )
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,175 @@
+"""In-memory view of store pods and jobs, kept current by cluster-wide watches.
+
+One thread per resource lists every matching object across the cluster and
+then follows a watch from that resourceVersion, so any number of health
+checks and readiness waits in the process cost dictionary lookups instead of
+API calls. Objects are indexed by namespace and name as small snapshots
+(see pod_snapshot and job_snapshot). Until the first list completes, or
+after a watch fails and before the relist, synced() is false and callers
+should query the API server directly.
+"""
+import logging
+import threading
+from time import monotonic, sleep
+from typing import Any, Callable
+
+from kubernetes import client, watch
+
+from app.services.k8s_client import (
+    WATCH_BACKOFF_INITIAL,
+    WATCH_BACKOFF_MAX,
+    WATCH_WINDOW_SECONDS,
+    K8sClient,
+    job_snapshot,
+    pod_snapshot,
+)
+
+logger = logging.getLogger("store_informer")
+
+STORE_NAMESPACE_PREFIX = "store-"
+# Pods of the store deployments; install and rebind job pods are not tracked.
+STORE_POD_SELECTOR = "app in (wordpress,mysql)"
+
+PODS = "pods"
+JOBS = "jobs"
+
+
+class StoreInformer:
+    def __init__(self, k8s: K8sClient):
+        self.k8s = k8s
+        self._index: dict[str, dict[str, dict[str, dict]]] = {PODS: {}, JOBS: {}}
+        self._synced = {PODS: False, JOBS: False}
+        # Bumped on every change so waiters can tell whether to sleep.
+        self._version = 0
+        self._condition = threading.Condition()
+
+    def start(self) -> "StoreInformer":
+        resources = (
+            (PODS, self.k8s.core.list_pod_for_all_namespaces, pod_snapshot, {"label_selector": STORE_POD_SELECTOR}),
+            (JOBS, self.k8s.batch.list_job_for_all_namespaces, job_snapshot, {}),
+        )
+        for kind, list_func, snapshot, list_kwargs in resources:
+            threading.Thread(
+                target=self._run,
+                args=(kind, list_func, snapshot, list_kwargs),
+                name=f"store-informer-{kind}",
+                daemon=True,
+            ).start()
+        return self
+
+    def synced(self, kind: str) -> bool:
+        return self._synced[kind]
+
+    def objects(self, kind: str, namespace: str) -> dict[str, dict] | None:
+        """Snapshots in a namespace by name, or None while the cache is not synced."""
+        with self._condition:
+            if not self._synced[kind]:
+                return None
+            return dict(self._index[kind].get(namespace, {}))
+
+    def wait(self, kind: str, namespace: str, done: Callable[[dict[str, dict], float], bool], timeout: float) -> bool | None:
+        """Block until done(objects, elapsed) is true; False once timeout passes.
+
+        done is re-evaluated after every change and at least once per watch
+        window, so time-based conditions still get checked. Returns None as
+        soon as the cache stops being synced; the caller should finish the
+        wait against the API server.
+        """
+        start = monotonic()
+        deadline = start + timeout
+        while True:
+            with self._condition:
+                if not self._synced[kind]:
+                    return None
+                version = self._version
+                objects = dict(self._index[kind].get(namespace, {}))
+            if done(objects, monotonic() - start):
+                return True
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return False
+            with self._condition:
+                if self._version == version:
+                    self._condition.wait(min(remaining, WATCH_WINDOW_SECONDS))
+
+    def _replace(self, kind: str, objects: dict[str, dict[str, dict]]):
+        with self._condition:
+            self._index[kind] = objects
+            self._synced[kind] = True
+            self._version += 1
+            self._condition.notify_all()
+
+    def _apply(self, kind: str, event_type: str, namespace: str, name: str, snapshot: dict):
+        with self._condition:
+            index = self._index[kind]
+            if event_type == "DELETED":
+                objects = index.get(namespace)
+                if objects is not None:
+                    objects.pop(name, None)
+                    if not objects:
+                        del index[namespace]
+            else:
+                index.setdefault(namespace, {})[name] = snapshot
+            self._version += 1
+            self._condition.notify_all()
+
+    def _run(self, kind: str, list_func: Callable[..., Any], snapshot: Callable[[Any], dict], list_kwargs: dict):
+        try:
+            self._list_and_watch(kind, list_func, snapshot, list_kwargs)
+        finally:
+            # Should the thread ever stop, readers must not keep trusting a frozen index.
+            self._unsync(kind)
+            logger.error(f"store_informer.stopped: {kind}")
+
+    def _list_and_watch(self, kind: str, list_func: Callable[..., Any], snapshot: Callable[[Any], dict], list_kwargs: dict):
+        backoff = WATCH_BACKOFF_INITIAL
+        resource_version: str | None = None
+        while True:
+            try:
+                if resource_version is None:
+                    listing = list_func(**list_kwargs)
+                    objects: dict[str, dict[str, dict]] = {}
+                    for item in listing.items:
+                        if item.metadata.namespace.startswith(STORE_NAMESPACE_PREFIX):
+                            objects.setdefault(item.metadata.namespace, {})[item.metadata.name] = snapshot(item)
+                    resource_version = listing.metadata.resource_version
+                    self._replace(kind, objects)
+                    logger.info(f"store_informer.synced: {kind}={sum(len(v) for v in objects.values())}")
+
+                stream = watch.Watch().stream(
+                    list_func,
+                    resource_version=resource_version,
+                    timeout_seconds=WATCH_WINDOW_SECONDS,
+                    _request_timeout=WATCH_WINDOW_SECONDS + 5,
+                    **list_kwargs,
+                )
+                for event in stream:
+                    obj = event["object"]
+                    resource_version = obj.metadata.resource_version
+                    if obj.metadata.namespace.startswith(STORE_NAMESPACE_PREFIX):
+                        self._apply(kind, event["type"], obj.metadata.namespace, obj.metadata.name, snapshot(obj))
+                backoff = WATCH_BACKOFF_INITIAL
+            except client.ApiException as exc:
+                if exc.status == 410:
+                    logger.info(f"store_informer.expired: {kind}; relisting")
+                    resource_version = None
+                    continue
+                resource_version = self._dropped(kind, exc, backoff)
+                backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+            except Exception as exc:
+                # Includes urllib3's MaxRetryError when the API server is unreachable.
+                resource_version = self._dropped(kind, exc, backoff)
+                backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+
+    def _unsync(self, kind: str):
+        with self._condition:
+            self._synced[kind] = False
+            # Wake waiters so they move over to the API server.
+            self._condition.notify_all()
+
+    def _dropped(self, kind: str, exc: Exception, backoff: float) -> None:
+        # Readers go back to live API calls until the relist succeeds.
+        self._unsync(kind)
+        logger.warning(f"store_informer.watch_dropped: {kind}: {exc}; relisting in {backoff}s")
+        sleep(backoff)
+        return None
@@ -1,15 +1,209 @@
-from sqlalchemy.orm import Session
+import base64
+import hashlib
+import uuid
+from datetime import datetime
 
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
 from app.models.store import StoreORM
+from app.models.user import UserORM
+from app.schemas.store import (
+    BatchItemResult,
+    BatchItemStatus,
+    CreateStoreRequest,
+    StoreResponse,
+    StoreStatus,
+    store_scheme,
+)
+from app.services.quotas import get_store_count
+
+
+async def get_store_by_id(db: AsyncSession, store_id) -> StoreORM | None:
+    return await db.get(StoreORM, store_id)
+
+
+async def get_store_owned(db: AsyncSession, store_id, user_id) -> StoreORM | None:
+    return await db.scalar(select(StoreORM).where(StoreORM.id == store_id, StoreORM.user_id == user_id))
+
+
+def _owned_stores_filter(user_id, statuses: list[StoreStatus] | None) -> list:
+    conditions = [StoreORM.user_id == user_id]
+    if statuses:
+        conditions.append(StoreORM.status.in_([status.value for status in statuses]))
+    return conditions
+
+
+def encode_cursor(store) -> str:
+    raw = f"{store.created_at.isoformat()}|{store.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, store_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(store_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+async def store_list_version(
+    db: AsyncSession,
+    user_id,
+    statuses: list[StoreStatus] | None = None,
+) -> tuple[datetime | None, int]:
+    """Latest updated_at and row count of a user's (filtered) stores.
+
+    Any insert, update or delete among those stores changes one of the two,
+    so together they version the listing without loading any rows.
+    """
+    row = (
+        await db.execute(
+            select(func.max(StoreORM.updated_at), func.count()).where(*_owned_stores_filter(user_id, statuses))
+        )
+    ).one()
+    return row[0], row[1]
+
+
+def store_list_etag(user_id, last_modified: datetime | None, count: int, *params) -> str:
+    key = "|".join(str(part) for part in (user_id, last_modified, count, settings.tls_enabled, *params))
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+# The StoreResponse fields; listings select only these columns.
+STORE_LIST_COLUMNS = (StoreORM.id, StoreORM.name, StoreORM.domain, StoreORM.status, StoreORM.created_at)
+
+
+def store_list_item(row) -> dict:
+    """StoreResponse-shaped dict for a STORE_LIST_COLUMNS row, without model validation."""
+    ready = row.status == StoreStatus.READY.value
+    return {
+        "id": row.id,
+        "name": row.name,
+        "domain": row.domain,
+        "status": row.status,
+        "created_at": row.created_at,
+        "url": f"{store_scheme(row.domain)}://{row.domain}" if ready else None,
+    }
+
+
+async def list_stores_page(
+    db: AsyncSession,
+    user_id,
+    limit: int,
+    cursor: str | None = None,
+    statuses: list[StoreStatus] | None = None,
+) -> tuple[list, str | None]:
+    """Newest-first page of a user's stores, keyset-paginated on (created_at, id).
+
+    Returns STORE_LIST_COLUMNS rows and the cursor of the next page, or None
+    on the last page.
+    """
+    query = select(*STORE_LIST_COLUMNS).where(*_owned_stores_filter(user_id, statuses))
+    if cursor:
+        created_at, store_id = decode_cursor(cursor)
+        query = query.where(tuple_(StoreORM.created_at, StoreORM.id) < tuple_(created_at, store_id))
+    query = query.order_by(StoreORM.created_at.desc(), StoreORM.id.desc()).limit(limit + 1)
+    stores = (await db.execute(query)).all()
+    if len(stores) > limit:
+        return stores[:limit], encode_cursor(stores[limit - 1])
+    return stores, None
+
+
+def store_domain(name: str) -> str:
+    return f"{name}.{settings.public_ip}.{settings.base_domain}"
+
+
+def _rejected(index: int, error: str, store_id=None) -> BatchItemResult:
+    return BatchItemResult(index=index, status=BatchItemStatus.REJECTED, store_id=store_id, error=error)
+
+
+async def create_stores_batch(
+    db: AsyncSession,
+    user_id,
+    quota_limit: int,
+    requests: list[CreateStoreRequest],
+) -> list[BatchItemResult]:
+    """Validate and insert a batch of stores in one transaction.
+
+    The user row is locked so concurrent batches cannot overshoot the quota.
+    Items are accepted in order until the quota runs out; every item gets its
+    own outcome.
+    """
+    (await db.execute(select(UserORM.id).where(UserORM.id == user_id).with_for_update())).one()
+    remaining = quota_limit - await get_store_count(db, user_id)
+
+    domains = [store_domain(request.name) for request in requests]
+    taken = set(await db.scalars(select(StoreORM.domain).where(StoreORM.domain.in_(domains))))
+
+    results: list[BatchItemResult | None] = [None] * len(requests)
+    rows: list[dict] = []
+    row_index: dict[uuid.UUID, int] = {}
+    for index, (request, domain) in enumerate(zip(requests, domains)):
+        if request.domain and request.domain != domain:
+            results[index] = _rejected(index, f"Domain must be {domain} for nip.io routing")
+        elif domain in taken:
+            results[index] = _rejected(index, "Domain already in use")
+        elif remaining <= 0:
+            results[index] = _rejected(index, "Quota exceeded")
+        else:
+            store_id = uuid.uuid4()
+            rows.append(
+                {
+                    "id": store_id,
+                    "user_id": user_id,
+                    "name": request.name,
+                    "domain": domain,
+                    "namespace": f"store-{store_id}",
+                    "status": StoreStatus.PENDING.value,
+                    "helm_release_name": f"store-{store_id}",
+                }
+            )
+            row_index[store_id] = index
+            taken.add(domain)
+            remaining -= 1
+
+    if rows:
+        # A single multi-row INSERT ... RETURNING for the whole batch.
+        stores = (await db.scalars(insert(StoreORM).returning(StoreORM), rows)).all()
+        for store in stores:
+            index = row_index[store.id]
+            results[index] = BatchItemResult(
+                index=index,
+                status=BatchItemStatus.ACCEPTED,
+                store_id=store.id,
+                store=StoreResponse.model_validate(store),
+            )
+    await db.commit()
+    return [result for result in results if result is not None]
 
 
-def get_store_by_id(db: Session, store_id) -> StoreORM | None:
-    return db.query(StoreORM).filter(StoreORM.id == store_id).first()
+async def mark_stores_deleting(db: AsyncSession, user_id, store_ids: list[uuid.UUID]) -> list[BatchItemResult]:
+    stores = {store.id: store for store in await db.scalars(select(StoreORM).where(StoreORM.id.in_(store_ids)))}
 
+    results: list[BatchItemResult] = []
+    accepted: list[uuid.UUID] = []
+    for index, store_id in enumerate(store_ids):
+        store = stores.get(store_id)
+        if store is None:
+            results.append(_rejected(index, "Store not found", store_id))
+        elif store.user_id != user_id:
+            results.append(_rejected(index, "Forbidden", store_id))
+        elif store_id in accepted:
+            results.append(_rejected(index, "Duplicate store id", store_id))
+        else:
+            accepted.append(store_id)
+            results.append(BatchItemResult(index=index, status=BatchItemStatus.ACCEPTED, store_id=store_id))
 
-def get_store_owned(db: Session, store_id, user_id) -> StoreORM | None:
-    return (
-        db.query(StoreORM)
-        .filter(StoreORM.id == store_id, StoreORM.user_id == user_id)
-        .first()
-    )
+    if accepted:
+        await db.execute(
+            update(StoreORM)
+            .where(StoreORM.id.in_(accepted))
+            .values(status=StoreStatus.DELETING.value)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    return results
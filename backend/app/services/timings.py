@@ -0,0 +1,95 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.phase_timing import StorePhaseTimingORM
+from app.models.store import StoreORM
+from app.schemas.timing import PhaseTimingStats, PhaseTimingsResponse, TimedOperation, TimedPhase
+
+# Upper bounds, in seconds, of the cumulative histogram buckets.
+HISTOGRAM_BUCKETS_SECONDS = (1, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def record_phase(
+    db: Session,
+    store_id: uuid.UUID | str,
+    operation: TimedOperation,
+    phase: TimedPhase,
+    started_at: datetime,
+    finished_at: datetime | None = None,
+    succeeded: bool = True,
+):
+    """Add a timing row to the session; committed with the caller's transaction."""
+    finished_at = finished_at or _utcnow()
+    db.add(
+        StorePhaseTimingORM(
+            store_id=store_id,
+            operation=operation.value,
+            phase=phase.value,
+            started_at=started_at,
+            finished_at=finished_at,
+            duration_ms=(finished_at - started_at).total_seconds() * 1000,
+            succeeded=succeeded,
+        )
+    )
+
+
+async def get_phase_timings(
+    db: AsyncSession,
+    window_minutes: int,
+    operation: TimedOperation | None = None,
+    user_id: uuid.UUID | None = None,
+) -> PhaseTimingsResponse:
+    """Percentiles and histograms of phase durations finished within the window.
+
+    Percentiles cover successful runs only; failed attempts are counted separately.
+    With user_id, only timings of stores that user currently owns are included,
+    so phases of stores already deleted drop out.
+    """
+    since = _utcnow() - timedelta(minutes=window_minutes)
+    duration = StorePhaseTimingORM.duration_ms
+    ok = StorePhaseTimingORM.succeeded.is_(True)
+
+    query = select(
+        StorePhaseTimingORM.operation,
+        StorePhaseTimingORM.phase,
+        func.count(),
+        func.count().filter(~ok),
+        func.percentile_cont(0.50).within_group(duration).filter(ok),
+        func.percentile_cont(0.95).within_group(duration).filter(ok),
+        func.percentile_cont(0.99).within_group(duration).filter(ok),
+        func.max(duration).filter(ok),
+        *[func.count().filter(ok, duration <= bound * 1000) for bound in HISTOGRAM_BUCKETS_SECONDS],
+        func.count().filter(ok),
+    ).where(StorePhaseTimingORM.finished_at >= since)
+    if operation is not None:
+        query = query.where(StorePhaseTimingORM.operation == operation.value)
+    if user_id is not None:
+        query = query.where(StorePhaseTimingORM.store_id.in_(select(StoreORM.id).where(StoreORM.user_id == user_id)))
+    rows = (await db.execute(query.group_by(StorePhaseTimingORM.operation, StorePhaseTimingORM.phase))).all()
+
+    labels = [str(bound) for bound in HISTOGRAM_BUCKETS_SECONDS] + ["+Inf"]
+    phase_order = list(TimedPhase)
+    stats = [
+        PhaseTimingStats(
+            operation=TimedOperation(row[0]),
+            phase=TimedPhase(row[1]),
+            count=row[2],
+            failed=row[3],
+            p50_ms=row[4],
+            p95_ms=row[5],
+            p99_ms=row[6],
+            max_ms=row[7],
+            histogram=dict(zip(labels, row[8:])),
+        )
+        for row in rows
+    ]
+    stats.sort(key=lambda item: (item.operation.value, phase_order.index(item.phase)))
+    return PhaseTimingsResponse(window_minutes=window_minutes, since=since, phases=stats)
@@ -1,25 +1,30 @@
-from sqlalchemy.orm import Session
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import hash_password, verify_password
 from app.models.user import UserORM
 
 
-def get_user_by_email(db: Session, email: str) -> UserORM | None:
-    return db.query(UserORM).filter(UserORM.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str) -> UserORM | None:
+    return await db.scalar(select(UserORM).where(UserORM.email == email))
 
 
-def create_user(db: Session, email: str, password: str) -> UserORM:
-    user = UserORM(email=email, hashed_password=hash_password(password))
+async def create_user(db: AsyncSession, email: str, password: str) -> UserORM:
+    # argon2 is CPU-bound; keep it off the event loop.
+    hashed_password = await asyncio.to_thread(hash_password, password)
+    user = UserORM(email=email, hashed_password=hashed_password)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> UserORM | None:
-    user = get_user_by_email(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> UserORM | None:
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await asyncio.to_thread(verify_password, password, user.hashed_password):
         return None
     return user
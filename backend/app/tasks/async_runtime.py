@@ -0,0 +1,454 @@
+"""asyncio execution mode for the store lifecycle (APP_WORKER_RUNTIME=asyncio).
+
+Celery tasks hand each store to a per-process event loop and return at once.
+Every in-flight provision or delete is then a coroutine: helm runs as an
+asyncio subprocess, Kubernetes is reached through kubernetes_asyncio, and the
+short database and Redis calls run on a small thread pool. A single worker
+process can therefore drive hundreds of stores.
+
+Because the Celery message is acknowledged before the pipeline finishes, each
+running pipeline is registered in Redis with a heartbeat. If a process dies,
+resume_orphaned_pipelines_task re-dispatches the stores it was driving; the
+checkpointed provisioning phase makes that resume where it stopped.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Iterator, cast
+
+from kubernetes_asyncio.client import ApiException
+from opentelemetry import context as otel_context
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.db.session import SessionLocal, init_db
+from app.models.provisioning import StoreProvisioningORM
+from app.models.store import StoreORM
+from app.schemas.store import ProvisioningPhase, StoreStatus
+from app.schemas.timing import TimedOperation, TimedPhase
+from app.services import admission
+from app.services.chart_renderer import get_chart_renderer
+from app.services.helm_client import AsyncHelmClient
+from app.services.k8s_async_client import AsyncK8sClient
+from app.services.redis_client import get_redis
+from app.services.timings import record_phase
+from app.tasks.celery_app import celery_app
+from app.tasks.store_tasks import (
+    ADMISSION_RECHECK_MAX_SECONDS,
+    INSTALL_JOB_NAME,
+    PHASE_TIMEOUTS,
+    REBIND_JOB_NAME,
+    _advance,
+    _build_values,
+    _check_phase_deadline,
+    _generate_credentials,
+    _get_progress,
+    _load_base_values,
+    _phase_elapsed,
+    _random_string,
+    _record_failure,
+    _utcnow,
+    delete_store_task,
+    provision_store_task,
+)
+
+logger = logging.getLogger("async_runtime")
+
+# Pipelines running somewhere, as "<kind>:<store_id>" scored by heartbeat expiry.
+INFLIGHT_KEY = "runtime:inflight"
+
+
+class AsyncRuntime:
+    """Event loop thread that runs store pipelines as coroutines."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._pipelines: dict[str, asyncio.Task] = {}
+        self._slots: asyncio.Semaphore | None = None
+        self._k8s: AsyncK8sClient | None = None
+        self._k8s_lock: asyncio.Lock | None = None
+        self.helm = AsyncHelmClient()
+        self._thread = threading.Thread(target=self._run, name="async-runtime", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=settings.async_runtime_io_threads, thread_name_prefix="async-runtime-io")
+        )
+        self._slots = asyncio.Semaphore(settings.async_runtime_max_pipelines)
+        self._k8s_lock = asyncio.Lock()
+        self.loop.create_task(self._heartbeat())
+        self.loop.run_forever()
+
+    def submit(self, kind: str, store_id: str):
+        """Start a "provision" or "delete" pipeline for a store; thread-safe.
+
+        The pipeline's spans join the caller's trace.
+        """
+        parent = otel_context.get_current()
+        asyncio.run_coroutine_threadsafe(self._start(kind, store_id, parent), self.loop).result()
+
+    async def k8s(self) -> AsyncK8sClient:
+        async with cast(asyncio.Lock, self._k8s_lock):
+            if self._k8s is None:
+                self._k8s = await AsyncK8sClient.create(settings.kubeconfig_path)
+        return self._k8s
+
+    async def _start(self, kind: str, store_id: str, parent: otel_context.Context | None = None):
+        key = f"{kind}:{store_id}"
+        if key in self._pipelines:
+            logger.info("async_runtime.duplicate", extra={"pipeline": key})
+            return
+        pipeline = provision_store if kind == "provision" else delete_store
+        task = self.loop.create_task(self._guarded(key, pipeline, store_id, parent))
+        self._pipelines[key] = task
+        task.add_done_callback(lambda _task: self._pipelines.pop(key, None))
+        await asyncio.to_thread(_register, [key])
+        logger.info("async_runtime.started", extra={"pipeline": key, "inflight": len(self._pipelines)})
+
+    async def _guarded(self, key: str, pipeline, store_id: str, parent: otel_context.Context | None):
+        try:
+            with tracer.start_as_current_span(
+                f"async_runtime.{key.split(':', 1)[0]}",
+                context=parent,
+                attributes={"store.id": store_id},
+            ):
+                async with cast(asyncio.Semaphore, self._slots):
+                    await pipeline(self, store_id)
+        except Exception:
+            logger.exception("async_runtime.pipeline_error", extra={"pipeline": key})
+        finally:
+            await asyncio.to_thread(_unregister, key)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.async_runtime_heartbeat_seconds)
+            keys = list(self._pipelines)
+            if not keys:
+                continue
+            await asyncio.to_thread(_register, keys)
+            for key in keys:
+                kind, store_id = key.split(":", 1)
+                if kind == "provision":
+                    await asyncio.to_thread(admission.refresh, store_id)
+
+
+_runtime: AsyncRuntime | None = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AsyncRuntime:
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            init_db()
+            _runtime = AsyncRuntime()
+        return _runtime
+
+
+def _register(keys: list[str]):
+    expires = time.time() + settings.async_runtime_heartbeat_seconds * 3
+    try:
+        get_redis().zadd(INFLIGHT_KEY, {key: expires for key in keys})
+    except RedisError as exc:
+        logger.warning(f"async_runtime.heartbeat_failed: {exc}")
+
+
+def _unregister(key: str):
+    try:
+        get_redis().zrem(INFLIGHT_KEY, key)
+    except RedisError as exc:
+        logger.warning(f"async_runtime.unregister_failed: {exc}")
+
+
+def claim_orphans() -> Iterator[tuple[str, str]]:
+    """Yield (kind, store_id) of pipelines whose heartbeat expired.
+
+    Each entry is removed before it is yielded, so concurrent callers never
+    claim the same pipeline twice.
+    """
+    redis_client = get_redis()
+    for key in redis_client.zrangebyscore(INFLIGHT_KEY, "-inf", time.time()):
+        if redis_client.zrem(INFLIGHT_KEY, key):
+            kind, store_id = key.split(":", 1)
+            yield kind, store_id
+
+
+@celery_app.task
+def resume_orphaned_pipelines_task():
+    for kind, store_id in claim_orphans():
+        logger.info("async_runtime.resume_orphan", extra={"pipeline": f"{kind}:{store_id}"})
+        task = provision_store_task if kind == "provision" else delete_store_task
+        task.delay(store_id)
+
+
+# Database steps. Each runs on the runtime's thread pool with its own session
+# and returns detached objects, so coroutines never trigger lazy loads.
+
+def _load_store(store_id: str) -> tuple[StoreORM, StoreProvisioningORM | None] | None:
+    db = SessionLocal()
+    try:
+        store = db.query(StoreORM).filter(StoreORM.id == store_id).first()
+        if not store:
+            return None
+        store = cast(Any, store)
+        progress = None
+        if store.status not in (StoreStatus.READY.value, StoreStatus.DELETING.value):
+            if not store.namespace:
+                store.namespace = f"store-{store.id}"
+            if not store.helm_release_name:
+                store.helm_release_name = f"store-{store.id}"
+            progress = _get_progress(db, store)
+            db.commit()
+            db.refresh(progress)
+        db.refresh(store)
+        return store, progress
+    finally:
+        db.close()
+
+
+def _save(store_id: str, progress_fields: dict | None = None, store_fields: dict | None = None):
+    db = SessionLocal()
+    try:
+        if progress_fields:
+            progress = db.get(StoreProvisioningORM, store_id)
+            for field, value in progress_fields.items():
+                setattr(progress, field, value)
+        if store_fields:
+            store = db.query(StoreORM).filter(StoreORM.id == store_id).first()
+            for field, value in store_fields.items():
+                setattr(store, field, value)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _advance_phase(store_id: str, phase: ProvisioningPhase, store_fields: dict) -> datetime:
+    """Move a store to its next phase, recording the one it leaves; returns the new start."""
+    db = SessionLocal()
+    try:
+        if store_fields:
+            store = db.query(StoreORM).filter(StoreORM.id == store_id).first()
+            for field, value in store_fields.items():
+                setattr(store, field, value)
+        progress = cast(StoreProvisioningORM, db.get(StoreProvisioningORM, store_id))
+        _advance(db, progress, phase)
+        return progress.phase_started_at
+    finally:
+        db.close()
+
+
+def _mark_ready(store_id: str):
+    db = SessionLocal()
+    try:
+        commit_started = _utcnow()
+        db.query(StoreORM).filter(StoreORM.id == store_id).update(
+            {StoreORM.status: StoreStatus.READY.value, StoreORM.ready_at: datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+        db.commit()
+        record_phase(db, store_id, TimedOperation.PROVISION, TimedPhase.DB_COMMIT, commit_started)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _record(store_id: str, phase: TimedPhase, started_at: datetime, succeeded: bool = True):
+    db = SessionLocal()
+    try:
+        record_phase(db, store_id, TimedOperation.DELETE, phase, started_at, succeeded=succeeded)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _delete_row(store_id: str, termination_started: datetime):
+    db = SessionLocal()
+    try:
+        store = db.query(StoreORM).filter(StoreORM.id == store_id).first()
+        if store:
+            record_phase(db, store_id, TimedOperation.DELETE, TimedPhase.NAMESPACE_TERMINATION, termination_started)
+            commit_started = _utcnow()
+            db.delete(store)
+            db.commit()
+            record_phase(db, store_id, TimedOperation.DELETE, TimedPhase.DB_COMMIT, commit_started)
+            db.commit()
+    finally:
+        db.close()
+
+
+async def _apply_chart(runtime: AsyncRuntime, k8s: AsyncK8sClient, store: Any, values: dict):
+    chart_path = settings.resolved_helm_chart_path
+    if settings.provisioning_engine == "apply":
+        # Rendering is cached per chart version, so this rarely runs helm.
+        manifests = await asyncio.to_thread(get_chart_renderer(chart_path).render, values)
+        await k8s.apply_manifests(manifests)
+        return
+    await runtime.helm.install(str(store.helm_release_name), chart_path, str(store.namespace), values, wait=False)
+
+
+async def _provision(runtime: AsyncRuntime, store_id: str):
+    loaded = await asyncio.to_thread(_load_store, store_id)
+    if loaded is None:
+        logger.info("provision_store.missing", extra={"store_id": store_id})
+        return
+    store, progress = cast(tuple[Any, StoreProvisioningORM], loaded)
+    if store.status == StoreStatus.READY.value:
+        logger.info("provision_store.already_ready", extra={"store_id": store_id})
+        return
+    if store.status == StoreStatus.DELETING.value:
+        logger.info("provision_store.deleting", extra={"store_id": store_id})
+        await asyncio.to_thread(admission.release, store_id)
+        return
+
+    k8s = await runtime.k8s()
+    namespace = str(store.namespace)
+
+    async def advance(phase: ProvisioningPhase, **store_fields):
+        progress.phase_started_at = await asyncio.to_thread(_advance_phase, store_id, phase, store_fields)
+        progress.phase = phase.value
+
+    def remaining() -> float:
+        return max(1.0, PHASE_TIMEOUTS[ProvisioningPhase(progress.phase)] - _phase_elapsed(progress))
+
+    while progress.phase != ProvisioningPhase.DONE.value:
+        _check_phase_deadline(progress)
+        phase = ProvisioningPhase(progress.phase)
+
+        if phase == ProvisioningPhase.ADMISSION:
+            if admission.capacity_stale():
+                try:
+                    admission.update_capacity(*await k8s.cluster_capacity())
+                except ApiException as exc:
+                    logger.warning(f"admission.capacity_unavailable: {exc.status} {exc.reason}")
+            requests = admission.store_requests(await asyncio.to_thread(_load_base_values))
+            result = await asyncio.to_thread(admission.admit, store_id, requests)
+            if not result.admitted:
+                await asyncio.sleep(
+                    min(max(result.wait_seconds, settings.provision_poll_interval_seconds), ADMISSION_RECHECK_MAX_SECONDS)
+                )
+                continue
+            await advance(ProvisioningPhase.NAMESPACE)
+
+        elif phase == ProvisioningPhase.NAMESPACE:
+            await k8s.ensure_namespace(namespace)
+            await advance(ProvisioningPhase.CHART)
+
+        elif phase == ProvisioningPhase.CHART:
+            if progress.failures and await k8s.job_failed(namespace, INSTALL_JOB_NAME, backoff_limit=5):
+                await k8s.delete_job(namespace, INSTALL_JOB_NAME)
+            if progress.credentials is None:
+                progress.credentials = _generate_credentials()
+                await asyncio.to_thread(_save, store_id, {"credentials": progress.credentials})
+            values = await asyncio.to_thread(_build_values, store, progress.credentials)
+            logger.info("provision_store.helm_install_start", extra={"release": store.helm_release_name, "engine": settings.provisioning_engine, "namespace": namespace})
+            await _apply_chart(runtime, k8s, store, values)
+            logger.info("provision_store.helm_install_complete", extra={"release": store.helm_release_name})
+            store.admin_username = values["wordpress"]["adminUser"]
+            store.admin_password = values["wordpress"]["adminPassword"]
+            await advance(
+                ProvisioningPhase.INSTALL_JOB,
+                admin_username=store.admin_username,
+                admin_password=store.admin_password,
+            )
+
+        elif phase == ProvisioningPhase.INSTALL_JOB:
+            await k8s.wait_for_job_completion(
+                namespace,
+                INSTALL_JOB_NAME,
+                timeout=remaining(),
+                backoff_limit=5,
+                already_waited=_phase_elapsed(progress),
+            )
+            await advance(ProvisioningPhase.PODS)
+
+        elif phase == ProvisioningPhase.PODS:
+            await k8s.wait_for_pods_ready(namespace, ["wordpress", "mysql"], timeout=remaining())
+            await advance(ProvisioningPhase.DONE)
+
+        elif phase == ProvisioningPhase.REBIND:
+            if progress.failures and await k8s.job_failed(namespace, REBIND_JOB_NAME, backoff_limit=3):
+                await k8s.delete_job(namespace, REBIND_JOB_NAME)
+            if store.admin_password is None:
+                progress.credentials = {**(progress.credentials or {}), "adminPassword": _random_string(32)}
+                store.admin_password = progress.credentials["adminPassword"]
+                await asyncio.to_thread(
+                    _save, store_id, {"credentials": progress.credentials}, {"admin_password": store.admin_password}
+                )
+            values = await asyncio.to_thread(_build_values, store, progress.credentials, progress.previous_domain)
+            logger.info("provision_store.rebind_start", extra={"release": store.helm_release_name, "domain": store.domain})
+            await _apply_chart(runtime, k8s, store, values)
+            await advance(ProvisioningPhase.REBIND_JOB)
+
+        elif phase == ProvisioningPhase.REBIND_JOB:
+            await k8s.wait_for_job_completion(
+                namespace,
+                REBIND_JOB_NAME,
+                timeout=remaining(),
+                backoff_limit=3,
+                already_waited=_phase_elapsed(progress),
+                ready_fallback=False,
+            )
+            await advance(ProvisioningPhase.PODS)
+
+    await asyncio.to_thread(_mark_ready, store_id)
+    await asyncio.to_thread(admission.release, store_id)
+    logger.info("provision_store.ready", extra={"store_id": store_id})
+
+
+async def provision_store(runtime: AsyncRuntime, store_id: str):
+    """Provision a store end to end; failures resume at the checkpointed phase."""
+    while True:
+        try:
+            await _provision(runtime, store_id)
+            return
+        except Exception as exc:
+            logger.exception("provision_store.error", extra={"store_id": store_id})
+            if not await asyncio.to_thread(_record_failure, store_id, exc, provision_store_task.max_retries):
+                return
+            await asyncio.sleep(celery_app.conf.task_default_retry_delay)
+
+
+async def _delete(runtime: AsyncRuntime, store_id: str):
+    loaded = await asyncio.to_thread(_load_store, store_id)
+    if loaded is None:
+        logger.info("delete_store.missing", extra={"store_id": store_id})
+        return
+    store = cast(Any, loaded[0])
+    await asyncio.to_thread(admission.release, store_id)
+
+    if settings.store_deletion_mode == "helm" and settings.provisioning_engine == "helm":
+        logger.info("delete_store.helm_uninstall", extra={"release": store.helm_release_name})
+        await runtime.helm.uninstall(str(store.helm_release_name), str(store.namespace))
+
+    k8s = await runtime.k8s()
+    logger.info("delete_store.delete_namespace", extra={"namespace": store.namespace})
+    started = _utcnow()
+    await k8s.delete_namespace(str(store.namespace), propagation_policy="Foreground")
+    await asyncio.to_thread(_record, store_id, TimedPhase.NAMESPACE_DELETE, started)
+
+    termination_started = _utcnow()
+    try:
+        await k8s.wait_for_namespace_deletion(str(store.namespace), timeout=settings.namespace_deletion_timeout_seconds)
+    except TimeoutError:
+        await asyncio.to_thread(_record, store_id, TimedPhase.NAMESPACE_TERMINATION, termination_started, False)
+        raise
+    await asyncio.to_thread(_delete_row, store_id, termination_started)
+    logger.info("delete_store.done", extra={"store_id": store_id})
+
+
+async def delete_store(runtime: AsyncRuntime, store_id: str):
+    for attempt in range(delete_store_task.max_retries + 1):
+        try:
+            await _delete(runtime, store_id)
+            return
+        except Exception:
+            logger.exception("delete_store.error", extra={"store_id": store_id, "attempt": attempt})
+            if attempt == delete_store_task.max_retries:
+                return
+            await asyncio.sleep(celery_app.conf.task_default_retry_delay)
@@ -1,19 +1,49 @@
 from celery import Celery
+from kombu import Queue
 
 from app.core.config import settings
+from app.core.metrics import instrument_celery
+from app.core.tracing import trace_celery
 
 
 celery_app = Celery(
     "provisioning",
     broker=settings.redis_url,
     backend=settings.redis_url,
-    include=["app.tasks.store_tasks"],
+    include=["app.tasks.store_tasks", "app.tasks.pool_tasks", "app.tasks.async_runtime"],
 )
 
+# Deletions free cluster capacity, so they are listed (and consumed) first.
+QUEUES = ("delete", "provision", "maintenance")
+
 celery_app.conf.update(
+    task_queues=[Queue(name) for name in QUEUES],
+    task_default_queue="maintenance",
+    task_routes={
+        "app.tasks.store_tasks.provision_store_task": {"queue": "provision"},
+        "app.tasks.store_tasks.delete_store_task": {"queue": "delete"},
+        "app.tasks.pool_tasks.*": {"queue": "maintenance"},
+        "app.tasks.async_runtime.*": {"queue": "maintenance"},
+    },
+    # A worker consuming several queues drains them in the order given to -Q
+    # instead of round-robin, so deletes are picked up ahead of provisioning.
+    broker_transport_options={"queue_order_strategy": "priority"},
     task_acks_late=True,
     worker_prefetch_multiplier=1,
     task_track_started=True,
     task_default_retry_delay=60,
     broker_connection_retry_on_startup=True,
+    beat_schedule={
+        "maintain-warm-pool": {
+            "task": "app.tasks.pool_tasks.maintain_warm_pool_task",
+            "schedule": float(settings.warm_pool_refill_interval_seconds),
+        },
+        "resume-orphaned-pipelines": {
+            "task": "app.tasks.async_runtime.resume_orphaned_pipelines_task",
+            "schedule": float(settings.async_runtime_heartbeat_seconds),
+        },
+    },
 )
+
+instrument_celery(celery_app)
+trace_celery(celery_app)
@@ -0,0 +1,46 @@
+import logging
+
+from app.core.config import settings
+from app.db.session import SessionLocal, init_db
+from app.models.store import StoreORM
+from app.schemas.store import StoreStatus
+from app.services.pool import create_pooled_store, get_pool_owner, pool_counts
+from app.tasks.celery_app import celery_app
+from app.tasks.store_tasks import delete_store_task, provision_store_task
+
+
+logger = logging.getLogger("pool_tasks")
+
+
+@celery_app.task
+def maintain_warm_pool_task():
+    """Top the warm pool up to warm_pool_size and recycle failed pool stores."""
+    if settings.warm_pool_size <= 0:
+        return
+    db = SessionLocal()
+    try:
+        init_db()
+        owner = get_pool_owner(db, create=True)
+        if owner is None:
+            return
+
+        failed = (
+            db.query(StoreORM)
+            .filter(StoreORM.user_id == owner.id, StoreORM.status == StoreStatus.ERROR.value)
+            .all()
+        )
+        for store in failed:
+            store.status = StoreStatus.DELETING.value
+            db.commit()
+            delete_store_task.delay(str(store.id))
+            logger.info("warm_pool.recycle", extra={"store_id": str(store.id)})
+
+        counts = pool_counts(db, owner.id)
+        available = counts.get(StoreStatus.READY.value, 0) + counts.get(StoreStatus.PENDING.value, 0)
+        missing = settings.warm_pool_size - available
+        for _ in range(max(missing, 0)):
+            store = create_pooled_store(db, owner.id)
+            provision_store_task.delay(str(store.id))
+            logger.info("warm_pool.refill", extra={"store_id": str(store.id)})
+    finally:
+        db.close()
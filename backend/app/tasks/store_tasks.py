@@ -1,27 +1,66 @@
-import copy
-import json
 import logging
 import secrets
-import tempfile
 import time
 from datetime import datetime, timezone
 from pathlib import Path
 import yaml
 from typing import Any, cast
 
+from celery import group
+from opentelemetry import trace
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.db.session import SessionLocal, init_db
+from app.models.provisioning import StoreProvisioningORM
 from app.models.store import StoreORM
-from app.schemas.store import StoreStatus
-from app.services.helm_client import HelmClient
-from app.services.k8s_client import K8sClient
+from app.schemas.store import ProvisioningPhase, StoreStatus
+from app.schemas.timing import TimedOperation, TimedPhase
+from app.services import admission
+from app.services.chart_renderer import get_chart_renderer
+from app.services.helm_client import HelmClient, get_helm_client
+from app.services.k8s_client import K8sClient, get_k8s_client
+from app.services.timings import record_phase
 from app.tasks.celery_app import celery_app
 
 
 logger = logging.getLogger("store_tasks")
 
+INSTALL_JOB_NAME = "woocommerce-install"
+REBIND_JOB_NAME = "store-rebind"
+
+# Upper bound, in seconds, on how long a store may sit in each phase.
+PHASE_TIMEOUTS = {
+    ProvisioningPhase.ADMISSION: settings.admission_max_wait_seconds,
+    ProvisioningPhase.NAMESPACE: 120,
+    ProvisioningPhase.CHART: 600,
+    ProvisioningPhase.INSTALL_JOB: 900,
+    ProvisioningPhase.PODS: 600,
+    ProvisioningPhase.REBIND: 600,
+    ProvisioningPhase.REBIND_JOB: 300,
+}
+
+# Name under which time spent in each phase is recorded.
+PHASE_TIMING_NAMES = {
+    ProvisioningPhase.ADMISSION: TimedPhase.ADMISSION_WAIT,
+    ProvisioningPhase.NAMESPACE: TimedPhase.ENSURE_NAMESPACE,
+    ProvisioningPhase.CHART: TimedPhase.HELM_INSTALL,
+    ProvisioningPhase.INSTALL_JOB: TimedPhase.INSTALL_JOB_WAIT,
+    ProvisioningPhase.PODS: TimedPhase.POD_READINESS,
+    ProvisioningPhase.REBIND: TimedPhase.REBIND,
+    ProvisioningPhase.REBIND_JOB: TimedPhase.REBIND_JOB_WAIT,
+}
+
+# Longest a queued store waits before checking for a slot again.
+ADMISSION_RECHECK_MAX_SECONDS = 60
+
+# A failed job cannot be waited on again; retries go back to the phase that
+# (re)creates it.
+RETRY_PHASES = {
+    ProvisioningPhase.INSTALL_JOB: ProvisioningPhase.CHART,
+    ProvisioningPhase.REBIND_JOB: ProvisioningPhase.REBIND,
+}
+
 
 def _random_string(length: int) -> str:
     alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
@@ -29,7 +68,12 @@ def _random_string(length: int) -> str:
 
 
 def _deep_merge(base: dict, override: dict) -> dict:
-    merged = copy.deepcopy(base)
+    """Merge override into base without mutating either.
+
+    Copy-on-write: only the dicts along overridden paths are copied, untouched
+    subtrees are shared with base, so the result must be treated as read-only.
+    """
+    merged = dict(base)
     for key, value in override.items():
         if isinstance(value, dict) and isinstance(merged.get(key), dict):
             merged[key] = _deep_merge(merged[key], value)
@@ -38,38 +82,66 @@ def _deep_merge(base: dict, override: dict) -> dict:
     return merged
 
 
+# Parsed values files keyed by path, invalidated when the file's mtime changes.
+_base_values_cache: dict[Path, tuple[float, dict]] = {}
+
+
 def _load_base_values() -> dict:
+    """Return the parsed profile values; shared across calls, do not mutate."""
     chart_path = Path(settings.resolved_helm_chart_path)
     profile = settings.values_profile
     candidate = chart_path / f"values-{profile}.yaml"
     fallback = chart_path / "values.yaml"
 
     values_path = candidate if candidate.exists() else fallback
+    mtime = values_path.stat().st_mtime
+    cached = _base_values_cache.get(values_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
     with values_path.open("r", encoding="utf-8") as handle:
-        return yaml.safe_load(handle) or {}
-
-
-def _build_values(store: StoreORM) -> dict:
-    mysql_password = _random_string(32)
-    root_password = _random_string(32)
-    admin_password = _random_string(32)
-    salts = {
-        "authKey": _random_string(64),
-        "secureAuthKey": _random_string(64),
-        "loggedInKey": _random_string(64),
-        "nonceKey": _random_string(64),
-        "authSalt": _random_string(64),
-        "secureAuthSalt": _random_string(64),
-        "loggedInSalt": _random_string(64),
-        "nonceSalt": _random_string(64),
+        values = yaml.safe_load(handle) or {}
+    _base_values_cache[values_path] = (mtime, values)
+    return values
+
+
+def _generate_credentials() -> dict:
+    return {
+        "mysqlPassword": _random_string(32),
+        "rootPassword": _random_string(32),
+        "adminPassword": _random_string(32),
+        "salts": {
+            "authKey": _random_string(64),
+            "secureAuthKey": _random_string(64),
+            "loggedInKey": _random_string(64),
+            "nonceKey": _random_string(64),
+            "authSalt": _random_string(64),
+            "secureAuthSalt": _random_string(64),
+            "loggedInSalt": _random_string(64),
+            "nonceSalt": _random_string(64),
+        },
     }
 
-    tls_enabled = settings.tls_enabled
-    if store.domain.endswith(".localtest.me") or store.domain.endswith(".localhost"):
-        tls_enabled = False
-    if store.domain.endswith(".nip.io") or store.domain.endswith(".sslip.io"):
-        tls_enabled = False
-    scheme = "https" if tls_enabled else "http"
+
+def _tls_enabled(domain: str) -> bool:
+    if domain.endswith(".localtest.me") or domain.endswith(".localhost"):
+        return False
+    if domain.endswith(".nip.io") or domain.endswith(".sslip.io"):
+        return False
+    return settings.tls_enabled
+
+
+def _site_url(domain: str) -> str:
+    scheme = "https" if _tls_enabled(domain) else "http"
+    return f"{scheme}://{domain}"
+
+
+def _build_values(store: StoreORM, credentials: dict, rebind_from: str | None = None) -> dict:
+    """Build helm values for a store.
+
+    rebind_from is the previous domain of a claimed warm pool store; the install
+    job is dropped and the rebind job moves the site over instead.
+    """
+    tls_enabled = _tls_enabled(store.domain)
 
     dynamic_values = {
         "storeName": store.name,
@@ -77,41 +149,160 @@ def _build_values(store: StoreORM) -> dict:
         "domain": store.domain,
         "namespace": {"name": store.namespace},
         "mysql": {
-            "rootPassword": root_password,
+            "rootPassword": credentials["rootPassword"],
             "database": "woocommerce",
             "user": "woocommerce",
-            "password": mysql_password,
+            "password": credentials["mysqlPassword"],
         },
         "wordpress": {
             "adminUser": "admin",
-            "adminPassword": admin_password,
+            "adminPassword": credentials["adminPassword"],
             "adminEmail": "admin@example.com",
             "siteTitle": store.name,
-            "siteUrl": f"{scheme}://{store.domain}",
-            "salts": salts,
+            "siteUrl": _site_url(store.domain),
+            "salts": credentials["salts"],
         },
         "ingress": {
             "className": settings.ingress_class_name,
             "tls": {"enabled": tls_enabled},
         },
+        # The worker tracks the install job itself, so helm must not block on it.
+        "installJob": {"enabled": rebind_from is None, "hook": False},
+        "rebind": {
+            "enabled": rebind_from is not None,
+            "fromUrl": _site_url(rebind_from) if rebind_from else "",
+        },
     }
 
     base_values = _load_base_values()
     return _deep_merge(base_values, dynamic_values)
 
 
-def _write_values(values: dict) -> str:
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json") as tmp:
-        json.dump(values, tmp)
-        return tmp.name
+def _apply_chart(helm: HelmClient, k8s: K8sClient, store: StoreORM, values: dict):
+    """Install or upgrade the store chart with the configured provisioning engine."""
+    chart_path = settings.resolved_helm_chart_path
+    if settings.provisioning_engine == "apply":
+        manifests = get_chart_renderer(chart_path).render(values)
+        k8s.apply_manifests(manifests)
+        return
+    helm.install(str(store.helm_release_name), chart_path, str(store.namespace), values, wait=False)
 
 
 def _get_db() -> Session:
     return SessionLocal()
 
 
+def _utcnow() -> datetime:
+    # Timestamp columns are naive and stored in UTC.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _get_progress(db: Session, store: StoreORM) -> StoreProvisioningORM:
+    progress = db.get(StoreProvisioningORM, store.id)
+    if progress is None:
+        progress = StoreProvisioningORM(
+            store_id=store.id,
+            phase=ProvisioningPhase.ADMISSION.value,
+            phase_started_at=_utcnow(),
+            failures=0,
+        )
+        db.add(progress)
+        db.commit()
+    return progress
+
+
+def _record_phase_timing(db: Session, progress: StoreProvisioningORM, succeeded: bool = True):
+    """Record the time spent in the current phase, from phase_started_at until now."""
+    record_phase(
+        db,
+        progress.store_id,
+        TimedOperation.PROVISION,
+        PHASE_TIMING_NAMES[ProvisioningPhase(progress.phase)],
+        progress.phase_started_at,
+        succeeded=succeeded,
+    )
+
+
+def _advance(db: Session, progress: StoreProvisioningORM, phase: ProvisioningPhase):
+    _record_phase_timing(db, progress)
+    progress.phase = phase.value
+    progress.phase_started_at = _utcnow()
+    progress.watch_state = None
+    db.commit()
+    trace.get_current_span().add_event("provision.phase", {"store.id": str(progress.store_id), "phase": phase.value})
+    logger.info("provision_store.phase", extra={"store_id": str(progress.store_id), "phase": phase.value})
+
+
+def _checkpoint_watch(db: Session, progress: StoreProvisioningORM, watch_state: dict):
+    """Save where the phase's watch stopped so the next run resumes instead of relisting."""
+    progress.watch_state = watch_state if watch_state.get("resource_version") else None
+    db.commit()
+
+
+def _phase_elapsed(progress: StoreProvisioningORM) -> float:
+    return (_utcnow() - progress.phase_started_at).total_seconds()
+
+
+def _check_phase_deadline(progress: StoreProvisioningORM):
+    phase = ProvisioningPhase(progress.phase)
+    if _phase_elapsed(progress) > PHASE_TIMEOUTS[phase]:
+        raise TimeoutError(f"Provisioning phase {phase.value} timed out")
+
+
+def _record_failure(store_id: str, exc: Exception, max_retries: int) -> bool:
+    """Count a failed attempt; returns True if the store should be retried.
+
+    Retries resume from the checkpointed phase instead of starting over.
+    """
+    db = _get_db()
+    try:
+        store = db.query(StoreORM).filter(StoreORM.id == store_id).first()
+        if not store:
+            return False
+        progress = _get_progress(db, store)
+        if progress.phase != ProvisioningPhase.DONE.value:
+            _record_phase_timing(db, progress, succeeded=False)
+        progress.failures += 1
+        progress.last_error = str(exc)
+        retry = progress.failures <= max_retries
+        if retry:
+            # Resume at the failed phase with a fresh time budget. Job phases step
+            # back and re-apply the chart, which recreates the job with the same
+            # checkpointed values.
+            phase = ProvisioningPhase(progress.phase)
+            progress.phase = RETRY_PHASES.get(phase, phase).value
+            progress.phase_started_at = _utcnow()
+            progress.watch_state = None
+        else:
+            store = cast(Any, store)
+            store.status = StoreStatus.ERROR.value
+            store.error_message = str(exc)
+        db.commit()
+        if not retry:
+            admission.release(store_id)
+        return retry
+    finally:
+        db.close()
+
+
 @celery_app.task(bind=True, max_retries=3)
 def provision_store_task(self, store_id: str):
+    """Advance a store through its provisioning phases.
+
+    Phases run back to back until one has to wait on the cluster; the task then
+    re-schedules itself instead of sleeping, so a worker slot is held for at most
+    provision_step_wait_seconds at a time. A watch that ran out of time is
+    checkpointed and resumed by an immediate re-run; only a store waiting for
+    admission sleeps out a countdown.
+
+    With the asyncio runtime the store is handed to the process event loop instead.
+    """
+    trace.get_current_span().set_attribute("store.id", store_id)
+    if settings.worker_runtime == "asyncio":
+        from app.tasks.async_runtime import get_runtime
+
+        get_runtime().submit("provision", store_id)
+        return
     db = _get_db()
     try:
         logger.info("provision_store.start", extra={"store_id": store_id})
@@ -124,6 +315,10 @@ def provision_store_task(self, store_id: str):
         if store.status == StoreStatus.READY.value:
             logger.info("provision_store.already_ready", extra={"store_id": store_id})
             return
+        if store.status == StoreStatus.DELETING.value:
+            logger.info("provision_store.deleting", extra={"store_id": store_id})
+            admission.release(store_id)
+            return
 
         if not store.namespace:
             store.namespace = f"store-{store.id}"
@@ -131,99 +326,231 @@ def provision_store_task(self, store_id: str):
             store.helm_release_name = f"store-{store.id}"
         db.commit()
 
-        values = _build_values(store)
-        values_path = _write_values(values)
-
-        helm = HelmClient()
-        k8s = K8sClient(settings.kubeconfig_path)
-        logger.info("provision_store.ensure_namespace", extra={"namespace": store.namespace})
-        k8s.ensure_namespace(str(store.namespace))
-        resolved_chart_path = settings.resolved_helm_chart_path
-        logger.info("provision_store.helm_install_start", extra={"release": store.helm_release_name, "chart": resolved_chart_path, "namespace": store.namespace})
-        try:
-            helm.install(str(store.helm_release_name), resolved_chart_path, str(store.namespace), values_path)
-            logger.info("provision_store.helm_install_complete", extra={"release": store.helm_release_name})
-        except Exception as helm_err:
-            logger.error("provision_store.helm_install_failed", extra={"release": store.helm_release_name, "error": str(helm_err)})
-            raise
-
-        logger.info("provision_store.wait_job_start", extra={"job": "woocommerce-install", "namespace": store.namespace})
-        try:
-            k8s.wait_for_job_completion(store.namespace, "woocommerce-install", timeout=900, backoff_limit=5)
-            logger.info("provision_store.wait_job_complete", extra={"job": "woocommerce-install"})
-        except Exception as job_err:
-            logger.error("provision_store.wait_job_failed", extra={"job": "woocommerce-install", "error": str(job_err)})
-            raise
-
-        deadline = time.time() + 600
-        while True:
-            wordpress = k8s.get_pod_status(str(store.namespace), "app=wordpress")
-            mysql = k8s.get_pod_status(str(store.namespace), "app=mysql")
-            ready = wordpress and mysql and all(p["ready"] for p in wordpress + mysql)
-            if ready:
-                break
-            if time.time() >= deadline:
-                raise RuntimeError("Pods not ready")
-            time.sleep(10)
+        progress = _get_progress(db, store)
+        helm = get_helm_client()
+        k8s = get_k8s_client()
+        step_wait = settings.provision_step_wait_seconds
+        countdown = settings.provision_poll_interval_seconds
+        if progress.phase != ProvisioningPhase.ADMISSION.value:
+            admission.refresh(store_id)
+
+        while progress.phase != ProvisioningPhase.DONE.value:
+            _check_phase_deadline(progress)
+            phase = ProvisioningPhase(progress.phase)
+            watch_state = dict(progress.watch_state or {})
+
+            if phase == ProvisioningPhase.ADMISSION:
+                requests = admission.store_requests(_load_base_values())
+                result = admission.admit(store_id, requests, k8s)
+                if not result.admitted:
+                    countdown = min(max(result.wait_seconds, countdown), ADMISSION_RECHECK_MAX_SECONDS)
+                    break
+                _advance(db, progress, ProvisioningPhase.NAMESPACE)
+
+            elif phase == ProvisioningPhase.NAMESPACE:
+                logger.info("provision_store.ensure_namespace", extra={"namespace": store.namespace})
+                k8s.ensure_namespace(str(store.namespace))
+                _advance(db, progress, ProvisioningPhase.CHART)
+
+            elif phase == ProvisioningPhase.CHART:
+                if progress.failures and k8s.job_failed(str(store.namespace), INSTALL_JOB_NAME, backoff_limit=5):
+                    # A failed install job from an earlier attempt is immutable and
+                    # would block the upgrade; let the chart create a fresh one.
+                    k8s.delete_job(str(store.namespace), INSTALL_JOB_NAME)
+                if progress.credentials is None:
+                    # Checkpoint credentials before anything is installed so a
+                    # retry never rotates the secrets of a half-installed store.
+                    progress.credentials = _generate_credentials()
+                    db.commit()
+                values = _build_values(store, progress.credentials)
+                logger.info("provision_store.helm_install_start", extra={"release": store.helm_release_name, "engine": settings.provisioning_engine, "namespace": store.namespace})
+                try:
+                    _apply_chart(helm, k8s, store, values)
+                    logger.info("provision_store.helm_install_complete", extra={"release": store.helm_release_name})
+                except Exception as helm_err:
+                    logger.error("provision_store.helm_install_failed", extra={"release": store.helm_release_name, "error": str(helm_err)})
+                    raise
+                store.admin_username = values["wordpress"]["adminUser"]
+                store.admin_password = values["wordpress"]["adminPassword"]
+                _advance(db, progress, ProvisioningPhase.INSTALL_JOB)
+
+            elif phase == ProvisioningPhase.INSTALL_JOB:
+                try:
+                    k8s.wait_for_job_completion(
+                        str(store.namespace),
+                        INSTALL_JOB_NAME,
+                        timeout=step_wait,
+                        backoff_limit=5,
+                        already_waited=_phase_elapsed(progress),
+                        watch_state=watch_state,
+                    )
+                except TimeoutError:
+                    _checkpoint_watch(db, progress, watch_state)
+                    countdown = 0
+                    break
+                logger.info("provision_store.wait_job_complete", extra={"job": INSTALL_JOB_NAME})
+                _advance(db, progress, ProvisioningPhase.PODS)
+
+            elif phase == ProvisioningPhase.PODS:
+                try:
+                    k8s.wait_for_pods_ready(
+                        str(store.namespace), ["wordpress", "mysql"], timeout=step_wait, watch_state=watch_state
+                    )
+                except TimeoutError:
+                    _checkpoint_watch(db, progress, watch_state)
+                    countdown = 0
+                    break
+                _advance(db, progress, ProvisioningPhase.DONE)
+
+            elif phase == ProvisioningPhase.REBIND:
+                if progress.failures and k8s.job_failed(str(store.namespace), REBIND_JOB_NAME, backoff_limit=3):
+                    k8s.delete_job(str(store.namespace), REBIND_JOB_NAME)
+                if store.admin_password is None:
+                    # Claimed from the warm pool: rotate the admin password once
+                    # and checkpoint it before the chart is upgraded.
+                    progress.credentials = {**progress.credentials, "adminPassword": _random_string(32)}
+                    store.admin_password = progress.credentials["adminPassword"]
+                    db.commit()
+                values = _build_values(store, progress.credentials, rebind_from=progress.previous_domain)
+                logger.info("provision_store.rebind_start", extra={"release": store.helm_release_name, "domain": store.domain})
+                _apply_chart(helm, k8s, store, values)
+                _advance(db, progress, ProvisioningPhase.REBIND_JOB)
+
+            elif phase == ProvisioningPhase.REBIND_JOB:
+                try:
+                    k8s.wait_for_job_completion(
+                        str(store.namespace),
+                        REBIND_JOB_NAME,
+                        timeout=step_wait,
+                        backoff_limit=3,
+                        already_waited=_phase_elapsed(progress),
+                        # A pooled store's WordPress is ready before the job runs.
+                        ready_fallback=False,
+                        watch_state=watch_state,
+                    )
+                except TimeoutError:
+                    _checkpoint_watch(db, progress, watch_state)
+                    countdown = 0
+                    break
+                logger.info("provision_store.rebind_complete", extra={"store_id": store_id})
+                # The upgrade rolls the wordpress deployment; wait for the new pods.
+                _advance(db, progress, ProvisioningPhase.PODS)
+
+        if progress.phase != ProvisioningPhase.DONE.value:
+            logger.info("provision_store.reschedule", extra={"store_id": store_id, "phase": progress.phase})
+            provision_store_task.apply_async((store_id,), countdown=countdown)
+            return
 
+        commit_started = _utcnow()
         store.status = StoreStatus.READY.value
-        store.admin_username = "admin"
-        store.admin_password = values["wordpress"]["adminPassword"]
         store.ready_at = datetime.now(timezone.utc)
         db.commit()
+        record_phase(db, store.id, TimedOperation.PROVISION, TimedPhase.DB_COMMIT, commit_started)
+        db.commit()
+        admission.release(store_id)
         logger.info("provision_store.ready", extra={"store_id": store_id})
     except Exception as exc:
         db.rollback()
         logger.exception("provision_store.error", extra={"store_id": store_id})
-        try:
-            self.retry(exc=exc)
-        except Exception:
-            error_db = _get_db()
-            try:
-                store = error_db.query(StoreORM).filter(StoreORM.id == store_id).first()
-                if store:
-                    store = cast(Any, store)
-                    store.status = StoreStatus.ERROR.value
-                    store.error_message = str(exc)
-                    error_db.commit()
-            finally:
-                error_db.close()
-            raise
+        if _record_failure(store_id, exc, self.max_retries):
+            provision_store_task.apply_async((store_id,), countdown=celery_app.conf.task_default_retry_delay)
+            return
+        raise
     finally:
         db.close()
 
 
+def _start_deletion(store: Any, k8s: K8sClient):
+    """Issue the delete for a store's resources; termination is tracked separately."""
+    if settings.store_deletion_mode == "helm" and settings.provisioning_engine == "helm":
+        logger.info("delete_store.helm_uninstall", extra={"release": store.helm_release_name})
+        get_helm_client().uninstall(str(store.helm_release_name), str(store.namespace))
+    # Foreground propagation removes every object (helm release secrets
+    # included) before the namespace itself; no helm hooks run.
+    logger.info("delete_store.delete_namespace", extra={"namespace": store.namespace})
+    k8s.delete_namespace(str(store.namespace), propagation_policy="Foreground")
+
+
 @celery_app.task(bind=True, max_retries=3)
-def delete_store_task(self, store_id: str):
+def delete_store_task(self, store_id: str, deletion_started: float | None = None):
+    """Delete a store's namespace and drop its row once Kubernetes confirms it is gone.
+
+    Like provisioning, the task watches for at most provision_step_wait_seconds
+    and then re-schedules itself, so many deletions progress side by side without
+    each holding a worker slot until its namespace terminates.
+    """
+    trace.get_current_span().set_attribute("store.id", store_id)
+    if settings.worker_runtime == "asyncio":
+        from app.tasks.async_runtime import get_runtime
+
+        get_runtime().submit("delete", store_id)
+        return
     db = _get_db()
     try:
-        logger.info("delete_store.start", extra={"store_id": store_id})
         init_db()
         store = db.query(StoreORM).filter(StoreORM.id == store_id).first()
         if not store:
             logger.info("delete_store.missing", extra={"store_id": store_id})
             return
         store = cast(Any, store)
+        k8s = get_k8s_client()
+
+        if deletion_started is None:
+            logger.info("delete_store.start", extra={"store_id": store_id})
+            admission.release(store_id)
+            started = _utcnow()
+            _start_deletion(store, k8s)
+            record_phase(db, store.id, TimedOperation.DELETE, TimedPhase.NAMESPACE_DELETE, started)
+            db.commit()
+            deletion_started = time.time()
+        termination_started = datetime.fromtimestamp(deletion_started, timezone.utc).replace(tzinfo=None)
 
-        helm = HelmClient()
-        logger.info("delete_store.helm_uninstall", extra={"release": store.helm_release_name})
-        helm.uninstall(str(store.helm_release_name), str(store.namespace))
-
-        k8s = K8sClient(settings.kubeconfig_path)
-        logger.info("delete_store.delete_namespace", extra={"namespace": store.namespace})
-        k8s.delete_namespace(str(store.namespace))
-        logger.info("delete_store.wait_namespace", extra={"namespace": store.namespace})
-        k8s.wait_for_namespace_deletion(str(store.namespace))
+        try:
+            k8s.wait_for_namespace_deletion(str(store.namespace), timeout=settings.provision_step_wait_seconds)
+        except TimeoutError:
+            if time.time() - deletion_started > settings.namespace_deletion_timeout_seconds:
+                record_phase(
+                    db, store.id, TimedOperation.DELETE, TimedPhase.NAMESPACE_TERMINATION, termination_started, succeeded=False
+                )
+                db.commit()
+                raise TimeoutError(f"Namespace {store.namespace} deletion timed out") from None
+            delete_store_task.apply_async(
+                (store_id,),
+                {"deletion_started": deletion_started},
+                countdown=settings.provision_poll_interval_seconds,
+            )
+            return
 
+        record_phase(db, store.id, TimedOperation.DELETE, TimedPhase.NAMESPACE_TERMINATION, termination_started)
+        commit_started = _utcnow()
         db.delete(store)
         db.commit()
+        record_phase(db, store_id, TimedOperation.DELETE, TimedPhase.DB_COMMIT, commit_started)
+        db.commit()
         logger.info("delete_store.done", extra={"store_id": store_id})
     except Exception as exc:
         db.rollback()
         logger.exception("delete_store.error", extra={"store_id": store_id})
-        try:
-            self.retry(exc=exc)
-        except Exception:
-            raise
+        # A retry issues the delete again and starts a fresh time budget.
+        raise self.retry(exc=exc, kwargs={"deletion_started": None})
     finally:
         db.close()
+
+
+def provision_stores_batch(store_ids: list[str]):
+    """Fan provisioning out as a Celery group, started in waves.
+
+    At most batch_provision_parallelism stores start per wave, and waves are
+    batch_provision_stagger_seconds apart, so a large batch does not hit the
+    cluster all at once.
+    """
+    parallelism = max(1, settings.batch_provision_parallelism)
+    stagger = settings.batch_provision_stagger_seconds
+    group(
+        provision_store_task.s(store_id).set(countdown=(index // parallelism) * stagger)
+        for index, store_id in enumerate(store_ids)
+    ).apply_async()
+
+
+def delete_stores_batch(store_ids: list[str]):
+    group(delete_store_task.s(store_id) for store_id in store_ids).apply_async()
@@ -0,0 +1,50 @@
+"""Start a Celery worker for one or more queues.
+
+    python -m app.tasks.worker                 # every queue, deletes first
+    python -m app.tasks.worker provision       # a provision-only pool
+    python -m app.tasks.worker delete maintenance
+
+The pool size is the sum of the configured concurrency of each queue. With
+APP_WORKER_RUNTIME=asyncio the worker uses the solo pool instead: tasks only
+hand stores to the process event loop, which runs them concurrently.
+"""
+import sys
+
+from app.core.config import settings
+from app.tasks.celery_app import QUEUES, celery_app
+
+
+def queue_concurrency(queue: str) -> int:
+    return {
+        "provision": settings.provision_worker_concurrency,
+        "delete": settings.delete_worker_concurrency,
+        "maintenance": settings.maintenance_worker_concurrency,
+    }[queue]
+
+
+def main(queues: list[str]):
+    unknown = [queue for queue in queues if queue not in QUEUES]
+    if unknown:
+        raise SystemExit(f"Unknown queue(s): {', '.join(unknown)}; expected any of {', '.join(QUEUES)}")
+    # Keep the priority order regardless of the order given on the command line.
+    selected = [queue for queue in QUEUES if not queues or queue in queues]
+    if settings.worker_runtime == "asyncio":
+        pool = ["-P", "solo"]
+    else:
+        pool = ["-c", str(sum(queue_concurrency(queue) for queue in selected))]
+    celery_app.worker_main(
+        [
+            "worker",
+            "-l",
+            "info",
+            "-Q",
+            ",".join(selected),
+            *pool,
+            "-n",
+            f"{'-'.join(selected)}@%h",
+        ]
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
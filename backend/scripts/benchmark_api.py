@@ -0,0 +1,276 @@
+"""Benchmarks for the API request hot paths.
+
+Measures latency and throughput of POST /auth/login (argon2 verify),
+GET /stores for a user with many stores, GET /stores/{id}, check_rate_limit
+and get_current_user (cold, and served from the principal cache), in-process through the FastAPI app with Celery stubbed
+out. Runs against the database from APP_DATABASE_URL; the models use Postgres
+column types (UUID, JSONB), so SQLite is not supported.
+
+    python scripts/benchmark_api.py
+    python scripts/benchmark_api.py --output run.json
+    python scripts/benchmark_api.py --baseline scripts/benchmark_api_baseline.json
+
+With --baseline the run exits with status 1 when any case's throughput drops,
+or its p95 latency grows, by more than --tolerance. Baselines are only
+comparable on the same machine and database; refresh the committed one with
+--output after intentional changes. The report records which rate limit
+backend check_rate_limit actually used (SQL when configured, or when Redis
+does not answer), and that case is only compared against a baseline taken
+with the same backend.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import uuid
+from time import perf_counter
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from celery import group  # noqa: E402
+from celery.app.task import Task  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from redis.exceptions import RedisError  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.api.deps import get_current_user  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.security import hash_password  # noqa: E402
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.rate_limit import RateLimitORM  # noqa: E402
+from app.models.store import StoreORM  # noqa: E402
+from app.models.user import UserORM  # noqa: E402
+from app.schemas.store import StoreStatus  # noqa: E402
+from app.services.principals import principal_cache  # noqa: E402
+from app.services.rate_limit import check_rate_limit  # noqa: E402
+from app.services.redis_client import get_async_redis  # noqa: E402
+
+BENCHMARK_EMAIL = "benchmark@example.com"
+BENCHMARK_PASSWORD = "benchmark-password"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_api_baseline.json")
+
+
+def _stub_celery():
+    # Nothing under test should reach a broker.
+    Task.apply_async = lambda self, *args, **kwargs: None
+    group.apply_async = lambda self, *args, **kwargs: None
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure(func, iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        func()
+    samples = []
+    started = perf_counter()
+    for _ in range(iterations):
+        call_started = perf_counter()
+        func()
+        samples.append(perf_counter() - call_started)
+    total = perf_counter() - started
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "throughput_per_second": round(iterations / total, 2),
+        "latency_ms": {
+            "p50": round(_percentile(samples, 0.5) * 1000, 3),
+            "p95": round(_percentile(samples, 0.95) * 1000, 3),
+            "p99": round(_percentile(samples, 0.99) * 1000, 3),
+            "max": round(samples[-1] * 1000, 3),
+        },
+    }
+
+
+def _expect(response, status_code: int = 200):
+    if response.status_code != status_code:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: {response.status_code} {response.text}")
+
+
+def _rate_limit_backend(loop) -> str:
+    """The backend check_rate_limit will use; it falls back to SQL when Redis does not answer."""
+    if settings.rate_limit_backend != "redis":
+        return "sql"
+
+    async def ping():
+        await get_async_redis().ping()
+
+    try:
+        loop.run_until_complete(ping())
+    except RedisError as exc:
+        print(f"Redis unavailable ({exc}); check_rate_limit measures the SQL fallback", file=sys.stderr)
+        return "sql"
+    return "redis"
+
+
+def _seed(db, store_count: int):
+    user = db.query(UserORM).filter(UserORM.email == BENCHMARK_EMAIL).first()
+    if user is not None:
+        db.delete(user)
+        db.commit()
+    user = UserORM(email=BENCHMARK_EMAIL, hashed_password=hash_password(BENCHMARK_PASSWORD))
+    db.add(user)
+    db.flush()
+    rows = []
+    for _ in range(store_count):
+        store_id = uuid.uuid4()
+        name = f"bench-{store_id.hex[:12]}"
+        rows.append(
+            {
+                "id": store_id,
+                "user_id": user.id,
+                "name": name,
+                "domain": f"{name}.{settings.public_ip}.{settings.base_domain}",
+                "namespace": f"store-{store_id}",
+                "status": StoreStatus.READY.value,
+                "helm_release_name": f"store-{store_id}",
+            }
+        )
+    if rows:
+        db.execute(insert(StoreORM), rows)
+    db.commit()
+    return user, [row["id"] for row in rows]
+
+
+def run(args) -> dict:
+    _stub_celery()
+    init_db()
+    db = SessionLocal()
+    user, store_ids = _seed(db, args.stores)
+    client = TestClient(app)
+    rng = random.Random(0)
+    # The service-level cases call the async functions directly on their own loop.
+    loop = asyncio.new_event_loop()
+    async_db = AsyncSessionLocal()
+    rate_limit_backend = _rate_limit_backend(loop)
+    try:
+        response = client.post("/auth/login", json={"email": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD})
+        _expect(response)
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def login():
+            _expect(client.post("/auth/login", json={"email": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD}))
+
+        def list_stores():
+            # Every page, so the case keeps covering the user's whole fleet.
+            cursor = None
+            while True:
+                response = client.get("/stores", params={"limit": 500, **({"cursor": cursor} if cursor else {})}, headers=headers)
+                _expect(response)
+                cursor = response.headers.get("x-next-cursor")
+                if not cursor:
+                    break
+
+        def get_store():
+            _expect(client.get(f"/stores/{rng.choice(store_ids)}", headers=headers))
+
+        def rate_limit():
+            allowed, _ = loop.run_until_complete(check_rate_limit(async_db, user.id, "benchmark", 10**9, 60))
+            if not allowed:
+                raise RuntimeError("benchmark rate limit exhausted")
+
+        def current_user():
+            # A principal cache miss every time: JWT decode plus the users query.
+            principal_cache.clear()
+            loop.run_until_complete(get_current_user(token=token, db=async_db))
+
+        def current_user_cached():
+            loop.run_until_complete(get_current_user(token=token, db=async_db))
+
+        cases = {
+            "auth_login": (login, args.slow_iterations),
+            "list_stores": (list_stores, args.slow_iterations),
+            "get_store": (get_store, args.iterations),
+            "check_rate_limit": (rate_limit, args.iterations),
+            "get_current_user": (current_user, args.iterations),
+            "get_current_user_cached": (current_user_cached, args.iterations),
+        }
+        selected = args.case or list(cases)
+        results = {}
+        for name in selected:
+            func, iterations = cases[name]
+            results[name] = measure(func, iterations, args.warmup)
+            print(f"{name}: {results[name]['throughput_per_second']}/s, p95 {results[name]['latency_ms']['p95']}ms", file=sys.stderr)
+    finally:
+        loop.run_until_complete(async_db.close())
+        loop.run_until_complete(async_engine.dispose())
+        loop.close()
+        db.rollback()
+        db.query(RateLimitORM).filter(RateLimitORM.user_id == user.id).delete(synchronize_session=False)
+        db.delete(user)
+        db.commit()
+        db.close()
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "database": engine.dialect.name,
+            "stores": args.stores,
+            "rate_limit_backend": rate_limit_backend,
+        },
+        "cases": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of report against baseline, as readable lines."""
+    regressions = []
+    backends = (report["environment"].get("rate_limit_backend"), baseline.get("environment", {}).get("rate_limit_backend"))
+    for name, current in report["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        if name == "check_rate_limit" and backends[0] != backends[1]:
+            print(f"{name}: not compared, measured on {backends[0]} but the baseline used {backends[1]}", file=sys.stderr)
+            continue
+        if current["throughput_per_second"] < previous["throughput_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name} throughput {current['throughput_per_second']}/s < baseline {previous['throughput_per_second']}/s"
+            )
+        if current["latency_ms"]["p95"] > previous["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{name} p95 {current['latency_ms']['p95']}ms > baseline {previous['latency_ms']['p95']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", type=int, default=2000, help="stores owned by the benchmark user")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--slow-iterations", type=int, default=50, help="iterations for login and listing")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--case",
+        action="append",
+        choices=("auth_login", "list_stores", "get_store", "check_rate_limit", "get_current_user", "get_current_user_cached"),
+    )
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+            handle.write("\n")
+    print(json.dumps(report, indent=2))
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
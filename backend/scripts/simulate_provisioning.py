@@ -0,0 +1,335 @@
+"""Capacity-planning simulator for the provisioning pipeline.
+
+Runs provision_store_task (and, with --delete, delete_store_task) for many
+stores through Celery against the in-process fake cluster in
+app.services.fake_cluster, then reports throughput, latency percentiles,
+per-phase timings and worker-slot utilization as JSON.
+
+    python scripts/simulate_provisioning.py --stores 1000 --concurrency 16 --time-scale 0.01
+    python scripts/simulate_provisioning.py --mode eager --stores 50 --delete
+    python scripts/simulate_provisioning.py --stores 500 --output run.json --baseline baseline.json
+
+--mode worker (the default) starts an in-process Celery worker with
+--concurrency threads on an in-memory broker, so countdown reschedules and
+queue waits behave as in production. --mode eager runs every task inline.
+
+The database and Redis from the usual APP_ settings are used. Simulated stores
+belong to a dedicated user that is removed afterwards. "simulated" figures
+divide wall-clock time by --time-scale; fixed costs (SQL, Celery) are not
+scaled, so they are upper bounds. --step-wait and --poll-interval are given
+in simulated seconds and compressed by --time-scale like the cluster, so
+reschedule waits are not inflated in the simulated figures.
+
+With --baseline the run exits with status 1 when throughput drops, or p95
+latency grows, by more than --tolerance against an earlier --output file.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["APP_CLUSTER_BACKEND"] = "fake"
+
+from celery.signals import task_postrun, task_prerun  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.security import hash_password  # noqa: E402
+from app.db.session import SessionLocal, init_db  # noqa: E402
+from app.models.phase_timing import StorePhaseTimingORM  # noqa: E402
+from app.models.store import StoreORM  # noqa: E402
+from app.models.user import UserORM  # noqa: E402
+from app.schemas.store import StoreStatus  # noqa: E402
+from app.schemas.timing import TimedOperation, TimedPhase  # noqa: E402
+from app.services import admission  # noqa: E402
+from app.services.fake_cluster import FakeCluster, SimulationProfile, set_fake_cluster  # noqa: E402
+from app.tasks.celery_app import celery_app  # noqa: E402
+from app.tasks.store_tasks import _utcnow, delete_store_task, provision_store_task  # noqa: E402
+
+SIMULATOR_EMAIL = "simulator@system.local"
+# How often the database is checked for finished stores.
+POLL_SECONDS = 0.2
+
+
+class SlotMeter:
+    """Accumulates how long worker slots spend running tasks."""
+
+    def __init__(self):
+        self.busy = 0.0
+        self.runs: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def started(self, task=None, **_):
+        # Eager reschedules nest inside the running task; only the outer run counts.
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._local.started = time.monotonic()
+        self._local.depth = depth + 1
+        with self._lock:
+            self.runs[task.name] = self.runs.get(task.name, 0) + 1
+
+    def finished(self, **_):
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            with self._lock:
+                self.busy += time.monotonic() - self._local.started
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def _distribution(values: list[float], scale: float = 1.0) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(value / scale for value in values)
+    return {
+        "p50": round(_percentile(ordered, 0.5), 3),
+        "p95": round(_percentile(ordered, 0.95), 3),
+        "p99": round(_percentile(ordered, 0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def _reset_user(db) -> UserORM:
+    user = db.query(UserORM).filter(UserORM.email == SIMULATOR_EMAIL).first()
+    if user is not None:
+        _cleanup(db, user, [store_id for (store_id,) in db.query(StoreORM.id).filter(StoreORM.user_id == user.id)])
+    user = UserORM(email=SIMULATOR_EMAIL, hashed_password=hash_password(os.urandom(16).hex()))
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _cleanup(db, user: UserORM, store_ids: list):
+    for store_id in store_ids:
+        admission.release(str(store_id))
+    db.query(StorePhaseTimingORM).filter(StorePhaseTimingORM.store_id.in_(store_ids)).delete(synchronize_session=False)
+    db.delete(user)
+    db.commit()
+
+
+def _create_store(db, user_id) -> uuid.UUID:
+    store_id = uuid.uuid4()
+    name = f"sim-{store_id.hex[:12]}"
+    db.add(
+        StoreORM(
+            id=store_id,
+            user_id=user_id,
+            name=name,
+            domain=f"{name}.{settings.public_ip}.{settings.base_domain}",
+            namespace=f"store-{store_id}",
+            status=StoreStatus.PENDING.value,
+            helm_release_name=f"store-{store_id}",
+        )
+    )
+    return store_id
+
+
+def _wait(db, done, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        if done():
+            return True
+        time.sleep(POLL_SECONDS)
+    return False
+
+
+def _finished_at(db, store_ids: list, operation: TimedOperation) -> dict:
+    rows = (
+        db.query(StorePhaseTimingORM.store_id, StorePhaseTimingORM.finished_at)
+        .filter(
+            StorePhaseTimingORM.store_id.in_(store_ids),
+            StorePhaseTimingORM.operation == operation.value,
+            StorePhaseTimingORM.phase == TimedPhase.DB_COMMIT.value,
+        )
+        .all()
+    )
+    return {store_id: finished_at for store_id, finished_at in rows}
+
+
+def _phase_breakdown(db, store_ids: list, time_scale: float) -> dict:
+    durations: dict[str, dict[str, list[float]]] = {}
+    rows = (
+        db.query(StorePhaseTimingORM.operation, StorePhaseTimingORM.phase, StorePhaseTimingORM.duration_ms)
+        .filter(StorePhaseTimingORM.store_id.in_(store_ids), StorePhaseTimingORM.succeeded.is_(True))
+        .all()
+    )
+    for operation, phase, duration_ms in rows:
+        durations.setdefault(operation, {}).setdefault(phase, []).append(duration_ms / 1000)
+    return {
+        operation: {phase: _distribution(values, time_scale) for phase, values in phases.items()}
+        for operation, phases in durations.items()
+    }
+
+
+def _summary(count: int, failed: int, wall: float, latencies: list[float], time_scale: float, runs: int) -> dict:
+    return {
+        "succeeded": len(latencies),
+        "failed": failed,
+        "unfinished": count - len(latencies) - failed,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_minute": round(len(latencies) / wall * 60, 3) if wall else 0.0,
+        "simulated_throughput_per_hour": round(len(latencies) / wall * 3600 * time_scale, 3) if wall else 0.0,
+        "latency_seconds": _distribution(latencies),
+        "simulated_latency_seconds": _distribution(latencies, time_scale),
+        "task_runs": runs,
+    }
+
+
+def run(args) -> dict:
+    profile = SimulationProfile.from_file(args.profile) if args.profile else SimulationProfile()
+    profile.time_scale = args.time_scale
+    if args.seed is not None:
+        profile.seed = args.seed
+    cluster = FakeCluster(profile)
+    set_fake_cluster(cluster)
+    # Reschedule waits and the estimate queued stores re-check admission after
+    # are compressed along with the cluster.
+    settings.provision_step_wait_seconds = args.step_wait * args.time_scale
+    settings.provision_poll_interval_seconds = args.poll_interval * args.time_scale
+    settings.provision_max_concurrent = args.max_concurrent
+    settings.provision_estimated_seconds = max(1, round(settings.provision_estimated_seconds * args.time_scale))
+
+    meter = SlotMeter()
+    task_prerun.connect(meter.started, weak=False)
+    task_postrun.connect(meter.finished, weak=False)
+    concurrency = 1 if args.mode == "eager" else args.concurrency
+
+    worker = None
+    if args.mode == "eager":
+        celery_app.conf.task_always_eager = True
+    else:
+        from celery.contrib.testing.worker import start_worker
+
+        celery_app.conf.broker_url = "memory://"
+        celery_app.conf.task_ignore_result = True
+        worker = start_worker(
+            celery_app,
+            pool="threads",
+            concurrency=concurrency,
+            perform_ping_check=False,
+            shutdown_timeout=30,
+            loglevel="WARNING",
+        )
+        worker.__enter__()
+
+    init_db()
+    db = SessionLocal()
+    user = _reset_user(db)
+    store_ids = [_create_store(db, user.id) for _ in range(args.stores)]
+    db.commit()
+    report: dict = {
+        "mode": args.mode,
+        "stores": args.stores,
+        "concurrency": concurrency,
+        "step_wait_seconds": args.step_wait,
+        "poll_interval_seconds": args.poll_interval,
+        "max_concurrent": args.max_concurrent,
+        "profile": profile.to_dict(),
+    }
+    try:
+        started = time.monotonic()
+        submitted = _utcnow()
+        for store_id in store_ids:
+            provision_store_task.delay(str(store_id))
+        terminal = (StoreStatus.READY.value, StoreStatus.ERROR.value)
+        finished = db.query(StoreORM).filter(StoreORM.id.in_(store_ids), StoreORM.status.in_(terminal))
+        _wait(db, lambda: finished.count() == len(store_ids), args.timeout)
+        wall = time.monotonic() - started
+        runs = meter.runs.get(provision_store_task.name, 0)
+        failed = db.query(StoreORM).filter(StoreORM.id.in_(store_ids), StoreORM.status == StoreStatus.ERROR.value).count()
+        latencies = [(at - submitted).total_seconds() for at in _finished_at(db, store_ids, TimedOperation.PROVISION).values()]
+        report["provision"] = _summary(len(store_ids), failed, wall, latencies, args.time_scale, runs)
+
+        if args.delete:
+            started = time.monotonic()
+            submitted = _utcnow()
+            db.query(StoreORM).filter(StoreORM.id.in_(store_ids)).update(
+                {StoreORM.status: StoreStatus.DELETING.value}, synchronize_session=False
+            )
+            db.commit()
+            for store_id in store_ids:
+                delete_store_task.delay(str(store_id))
+            remaining = db.query(StoreORM).filter(StoreORM.id.in_(store_ids))
+            _wait(db, lambda: remaining.count() == 0, args.timeout)
+            delete_wall = time.monotonic() - started
+            deleted = _finished_at(db, store_ids, TimedOperation.DELETE)
+            latencies = [(at - submitted).total_seconds() for at in deleted.values()]
+            runs = meter.runs.get(delete_store_task.name, 0)
+            report["delete"] = _summary(len(store_ids), 0, delete_wall, latencies, args.time_scale, runs)
+            wall += delete_wall
+
+        report["slot_utilization"] = round(meter.busy / (concurrency * wall), 4) if wall else 0.0
+        report["phases"] = _phase_breakdown(db, store_ids, args.time_scale)
+        report["cluster"] = dict(cluster.stats)
+    finally:
+        if worker is not None:
+            worker.__exit__(None, None, None)
+        db.expire_all()
+        _cleanup(db, user, store_ids)
+        db.close()
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of report against baseline, as readable lines."""
+    regressions = []
+    for operation in ("provision", "delete"):
+        current, previous = report.get(operation), baseline.get(operation)
+        if not current or not previous:
+            continue
+        if current["throughput_per_minute"] < previous["throughput_per_minute"] * (1 - tolerance):
+            regressions.append(
+                f"{operation} throughput {current['throughput_per_minute']}/min "
+                f"< baseline {previous['throughput_per_minute']}/min"
+            )
+        now_p95 = current["latency_seconds"].get("p95")
+        was_p95 = previous["latency_seconds"].get("p95")
+        if now_p95 is not None and was_p95 is not None and now_p95 > was_p95 * (1 + tolerance):
+            regressions.append(f"{operation} p95 latency {now_p95}s > baseline {was_p95}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", type=int, default=100)
+    parser.add_argument("--mode", choices=("worker", "eager"), default="worker")
+    parser.add_argument("--concurrency", type=int, default=settings.provision_worker_concurrency)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--profile", help="JSON SimulationProfile overrides")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--step-wait", type=float, default=settings.provision_step_wait_seconds, help="simulated seconds")
+    parser.add_argument("--poll-interval", type=float, default=settings.provision_poll_interval_seconds, help="simulated seconds")
+    parser.add_argument("--max-concurrent", type=int, default=settings.provision_max_concurrent)
+    parser.add_argument("--delete", action="store_true", help="delete every store after provisioning")
+    parser.add_argument("--timeout", type=float, default=3600, help="wall-clock seconds to wait per stage")
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--baseline", help="report from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Print the span tree of one store from a tracing "file" export.
+
+Usage: python scripts/trace_report.py <store_id> [traces.jsonl]
+
+Every trace that touched the store is printed as an indented tree with each
+span's offset from the start of the trace and its duration, followed by the
+slowest span names, so queue wait, helm, Kubernetes and SQL time can be told
+apart.
+"""
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                span = json.loads(line)
+                span["start"] = datetime.fromisoformat(span["start_time"]).timestamp()
+                span["end"] = datetime.fromisoformat(span["end_time"]).timestamp()
+                yield span
+
+
+def _print_tree(span, children, origin, depth=0):
+    offset = span["start"] - origin
+    duration = span["end"] - span["start"]
+    status = " ERROR" if span["status"]["status_code"] == "ERROR" else ""
+    print(f"{offset:9.2f}s {duration:9.3f}s  {'  ' * depth}{span['name']}{status}")
+    for child in sorted(children[span["context"]["span_id"]], key=lambda item: item["start"]):
+        _print_tree(child, children, origin, depth + 1)
+
+
+def report(store_id, path="traces.jsonl"):
+    spans = list(_load(path))
+    trace_ids = {span["context"]["trace_id"] for span in spans if span["attributes"].get("store.id") == store_id}
+    if not trace_ids:
+        print(f"No spans for store {store_id} in {path}")
+        return
+
+    totals = defaultdict(float)
+    for trace_id in sorted(trace_ids):
+        trace_spans = [span for span in spans if span["context"]["trace_id"] == trace_id]
+        ids = {span["context"]["span_id"] for span in trace_spans}
+        children = defaultdict(list)
+        roots = []
+        for span in trace_spans:
+            totals[span["name"]] += span["end"] - span["start"]
+            if span["parent_id"] in ids:
+                children[span["parent_id"]].append(span)
+            else:
+                roots.append(span)
+        origin = min(span["start"] for span in trace_spans)
+        end = max(span["end"] for span in trace_spans)
+        print(f"trace {trace_id} ({end - origin:.1f}s)")
+        print(f"{'offset':>10} {'duration':>10}  span")
+        for root in sorted(roots, key=lambda item: item["start"]):
+            _print_tree(root, children, origin)
+        print()
+
+    print("slowest spans (total seconds)")
+    for name, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:15]:
+        print(f"{total:10.2f}  {name}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    report(*sys.argv[1:3])
@@ -1,6 +1,7 @@
 import { NextResponse } from "next/server";
 
 const API_TARGET = process.env.API_TARGET || "http://localhost:8000";
+const FORWARDED_RESPONSE_HEADERS = ["etag", "last-modified", "cache-control", "retry-after", "x-next-cursor"];
 
 async function handler(request: Request, context: { params: { path: string[] } }) {
   const { path } = context.params;
@@ -17,12 +18,25 @@ async function handler(request: Request, context: { params: { path: string[] } }
   };
 
   const response = await fetch(targetUrl, init);
+  const responseHeaders: Record<string, string> = {};
+  for (const name of FORWARDED_RESPONSE_HEADERS) {
+    const value = response.headers.get(name);
+    if (value) {
+      responseHeaders[name] = value;
+    }
+  }
+
+  if (response.status === 304) {
+    return new NextResponse(null, { status: 304, headers: responseHeaders });
+  }
+
   const contentType = response.headers.get("content-type") || "application/json";
   const body = await response.text();
 
   return new NextResponse(body, {
     status: response.status,
     headers: {
+      ...responseHeaders,
       "content-type": contentType,
     },
   });
@@ -24,6 +24,44 @@ async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
   return (await response.json()) as T;
 }
 
+// Last full listing and the ETag of its first page; unchanged polls get a 304.
+let storeListCache: { etag: string; stores: Store[] } | null = null;
+
+async function listStores(): Promise<Store[]> {
+  const token = getToken();
+  const headers = new Headers();
+  if (token) {
+    headers.set("Authorization", `Bearer ${token}`);
+  }
+  const cached = storeListCache;
+  const stores: Store[] = [];
+  let cursor: string | null = null;
+  let etag: string | null = null;
+
+  do {
+    const query: string = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    const pageHeaders = new Headers(headers);
+    if (!cursor && cached) {
+      pageHeaders.set("If-None-Match", cached.etag);
+    }
+    const response = await fetch(`${BASE_URL}/stores${query}`, { headers: pageHeaders, cache: "no-store" });
+    if (response.status === 304 && cached) {
+      return cached.stores;
+    }
+    if (!response.ok) {
+      throw (await response.json()) as APIError;
+    }
+    if (!cursor) {
+      etag = response.headers.get("etag");
+    }
+    stores.push(...((await response.json()) as Store[]));
+    cursor = response.headers.get("x-next-cursor");
+  } while (cursor);
+
+  storeListCache = etag ? { etag, stores } : null;
+  return stores;
+}
+
 export const api = {
   register: (email: string, password: string) =>
     request<{ access_token: string }>("/auth/register", {
@@ -40,7 +78,7 @@ export const api = {
       method: "POST",
       body: JSON.stringify(payload),
     }),
-  listStores: () => request<Store[]>("/stores"),
+  listStores,
   getStore: (id: string) => request<StoreDetails>(`/stores/${id}`),
   deleteStore: (id: string) => request<void>(`/stores/${id}`, { method: "DELETE" }),
   getHealth: (id: string) => request<HealthStatus>(`/stores/${id}/health`),
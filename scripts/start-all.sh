@@ -34,7 +34,8 @@ nohup "$VENV_PY" -m uvicorn app.main:app --host 0.0.0.0 --port 8000 --log-level
   > "$LOG_DIR/uvicorn.log" 2>&1 &
 echo $! > "$LOG_DIR/uvicorn.pid"
 
-nohup "$VENV_PY" -m celery -A app.tasks.celery_app.celery_app worker -l info \
+# A single local worker consumes every queue, deletes first.
+nohup "$VENV_PY" -m app.tasks.worker \
   > "$LOG_DIR/celery.log" 2>&1 &
 echo $! > "$LOG_DIR/celery.pid"
 
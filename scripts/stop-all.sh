@@ -32,6 +32,7 @@ stop_pid "frontend"
 # Fallback: kill any stray processes by pattern
 pkill -f "uvicorn app.main:app" >/dev/null 2>&1 || true
 pkill -f "celery -A app.tasks.celery_app.celery_app worker" >/dev/null 2>&1 || true
+pkill -f "app.tasks.worker" >/dev/null 2>&1 || true
 pkill -f "npm run dev" >/dev/null 2>&1 || true
 pkill -f "next dev" >/dev/null 2>&1 || true
 